@@ -0,0 +1,111 @@
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from metrics import Metrics
+
+
+class LatestSlot:
+    # Cola de un solo elemento entre hilos: un resultado nuevo sustituye al que no se llegó a mostrar
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.item = None
+        self.posted = 0.0
+        self.coalesced = 0
+
+    def put(self, item):
+        with self.lock:
+            if self.item is not None:
+                self.coalesced += 1
+            self.item = item
+            self.posted = time.perf_counter()
+
+    def take(self):
+        # Devuelve (elemento, segundos desde que se publicó) o (None, None) si no hay nada nuevo
+        with self.lock:
+            item, self.item = self.item, None
+            if item is None:
+                return None, None
+            return item, time.perf_counter() - self.posted
+
+
+class AnalysisScheduler:
+    def __init__(self, stream, engine, hop_size=512, wait_timeout=0.05, metrics=None):
+        self.stream = stream
+        self.engine = engine
+        self.wait_timeout = wait_timeout
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.hop_buffer = np.empty(hop_size, dtype=np.int16)
+        self.results = LatestSlot()
+        self.reported_coalesced = 0
+        self.errors = 0
+        self.last_error = None
+        # El hilo de análisis lo toma durante feed/analyze; la interfaz, para tocar el motor o su espectro
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        engine.subscribe(self.results.put)
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="analysis", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self):
+        while not self.stopping.is_set():
+            # Se despierta cuando llega audio (o al agotar el tiempo), no a intervalos fijos
+            self.stream.wait(self.wait_timeout)
+            try:
+                self.step()
+            except Exception as error:
+                # Un frame defectuoso no puede matar el hilo: la pantalla se quedaría congelada sin aviso
+                self.errors += 1
+                self.last_error = error
+                self.metrics.increment("analysis_errors")
+                if self.errors == 1:
+                    traceback.print_exc()
+
+    def step(self):
+        # Consume todos los saltos disponibles y analiza solo la ventana más reciente
+        windows_ready = 0
+        hops = 0
+        with self.lock:
+            with self.metrics.stage("audio_read"):
+                hop_data = self.stream.read_into(self.hop_buffer)
+            while hop_data is not None:
+                hops += 1
+                if self.engine.feed(hop_data):
+                    windows_ready += 1
+                with self.metrics.stage("audio_read"):
+                    hop_data = self.stream.read_into(self.hop_buffer)
+
+            if windows_ready:
+                self.metrics.increment("skipped_windows", windows_ready - 1)
+                # El motor notifica el resultado a self.results; None si una pulsación del mismo
+                # bloque vació la ventana después de darla por lista
+                if self.engine.analyze() is None:
+                    self.metrics.increment("cleared_windows")
+            elif not hops:
+                self.metrics.increment("empty_polls")
+        return windows_ready
+
+    def latest(self):
+        # Desde el hilo de la interfaz: el último resultado, descartando los que no se llegaron a mostrar
+        result, age = self.results.take()
+        if result is not None:
+            self.metrics.observe("display_latency", age)
+            coalesced = self.results.coalesced
+            self.metrics.increment("coalesced_results", coalesced - self.reported_coalesced)
+            self.reported_coalesced = coalesced
+        return result
@@ -1,26 +1,198 @@
+import threading
+
+import numpy as np
 import pyaudio
 
+from capture import CaptureWriter
+
+
+class RingBuffer:
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        # Contadores monotónicos: un único productor avanza write_index y un
+        # único consumidor avanza read_index, así que no hace falta un lock.
+        self.write_index = 0
+        self.read_index = 0
+        self.overruns = 0
+        self.dropped_samples = 0
+
+    def write(self, samples):
+        count = len(samples)
+        if count > self.capacity:
+            self.dropped_samples += count - self.capacity
+            samples = samples[-self.capacity:]
+            count = self.capacity
+
+        start = self.write_index % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            self.buffer[start:end] = samples
+        else:
+            split = self.capacity - start
+            self.buffer[start:] = samples[:split]
+            self.buffer[:end - self.capacity] = samples[split:]
+
+        # Publicar el nuevo índice solo después de copiar los datos
+        self.write_index += count
+
+    def available(self):
+        return self.write_index - self.read_index
+
+    def _copy_out(self, start_index, count, out):
+        if out is None:
+            out = np.empty(count, dtype=self.buffer.dtype)
+        start = start_index % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            out[:] = self.buffer[start:end]
+        else:
+            split = self.capacity - start
+            out[:split] = self.buffer[start:]
+            out[split:] = self.buffer[:end - self.capacity]
+        return out
+
+    def read(self, count, out=None):
+        write_index = self.write_index
+        lag = write_index - self.read_index
+        if lag > self.capacity:
+            # El productor dio la vuelta al consumidor: descartar lo sobrescrito
+            self.overruns += 1
+            self.dropped_samples += lag - self.capacity
+            self.read_index = write_index - self.capacity
+            lag = self.capacity
+
+        if lag < count:
+            return None
+
+        out = self._copy_out(self.read_index, count, out)
+        self.read_index += count
+        return out
+
+    def latest(self, count, out=None):
+        write_index = self.write_index
+        if count > self.capacity or write_index < count:
+            return None
+        return self._copy_out(write_index - count, count, out)
+
+
 class AudioStream:
-    def __init__(self, format, channels, rate, chunk):
+    STATS_GAUGES = ("buffered_samples",)  # Valores instantáneos de stats(); el resto son contadores
+
+    def __init__(self, format, channels, rate, chunk, use_callback=False, buffer_seconds=2.0,
+                 capture_path=None, device_index=None):
         self.p = pyaudio.PyAudio()
+        self.chunk = chunk
+        self.rate = rate
+        self.channels = channels
+        self.use_callback = use_callback
+        self.overflows = 0
+        self.ring = None
+        # Lo activa el callback en cada bloque: el hilo de análisis espera audio en lugar de sondear
+        self.data_ready = threading.Event()
+        # Grabación opcional del audio crudo para reproducirlo luego con ReplayStream
+        self.capture = CaptureWriter(capture_path, rate, channels) if capture_path else None
+
+        stream_callback = None
+        if use_callback:
+            # El anillo guarda las muestras entrelazadas tal como llegan (frames × canales)
+            capacity = max(chunk * 2, int(rate * buffer_seconds)) * channels
+            self.ring = RingBuffer(capacity)
+            stream_callback = self._callback
+        self.interleaved = np.zeros(0, dtype=np.int16)
+
         self.stream = self.p.open(
             format=format,
             channels=channels,
             rate=rate,
             input=True,
             frames_per_buffer=chunk,
+            input_device_index=device_index,
+            stream_callback=stream_callback,
         )
-        self.chunk = chunk
 
-    def read(self):
+        if use_callback:
+            self.stream.start_stream()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        self.ring.write(samples)
+        if self.capture is not None:
+            self.capture.write(samples)
+        self.data_ready.set()
+        return None, pyaudio.paContinue
+
+    def wait(self, timeout=None):
+        # Bloquea hasta que el callback entregue audio nuevo; sin callback la propia lectura bloquea
+        if not self.use_callback:
+            return True
+        ready = self.data_ready.wait(timeout)
+        self.data_ready.clear()
+        return ready
+
+    def read(self, frames=None):
+        if frames is None:
+            frames = self.chunk
+
+        if self.use_callback:
+            # Nunca bloquea: devuelve el siguiente bloque solo si ya está capturado
+            samples = self.ring.read(frames)
+            if samples is None:
+                return None
+            return samples.tobytes()
+
         try:
-            data = self.stream.read(self.chunk, exception_on_overflow=False)
+            data = self.stream.read(frames, exception_on_overflow=False)
+            if self.capture is not None:
+                self.capture.write(np.frombuffer(data, dtype=np.int16))
             return data
         except IOError:
-            print("Input overflowed, skipping this buffer.")
+            self.overflows += 1
             return None
 
+    def read_into(self, out):
+        # Como read(), pero copia el siguiente bloque de len(out) muestras en `out` (sin crear bytes)
+        if self.use_callback:
+            return self.ring.read(len(out), out)
+        data = self.read(len(out))
+        if data is None:
+            return None
+        np.copyto(out, np.frombuffer(data, dtype=np.int16))
+        return out
+
+    def available(self):
+        # Frames (muestras por canal) que se pueden leer ya sin bloquear
+        if self.use_callback:
+            return self.ring.available() // self.channels
+        return self.stream.get_read_available()
+
+    def read_channels(self, out):
+        # Siguiente bloque desentrelazado en `out`, de forma (canales, frames)
+        if len(self.interleaved) != out.size:
+            self.interleaved = np.empty(out.size, dtype=np.int16)
+        if self.read_into(self.interleaved) is None:
+            return None
+        np.copyto(out, self.interleaved.reshape(-1, self.channels).T)
+        return out
+
+    def read_latest(self, count, out=None):
+        if not self.use_callback:
+            return None
+        return self.ring.latest(count, out)
+
+    def stats(self):
+        stats = {"overflows": self.overflows}
+        if self.ring is not None:
+            stats["overruns"] = self.ring.overruns
+            stats["dropped_samples"] = self.ring.dropped_samples
+            stats["buffered_samples"] = self.ring.available()
+        return stats
+
     def close(self):
         self.stream.stop_stream()
         self.stream.close()
         self.p.terminate()
+        if self.capture is not None:
+            self.capture.close()
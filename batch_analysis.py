@@ -0,0 +1,155 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.io import wavfile
+
+from note_table import A4_FREQUENCY, nearest_note
+from pitch_estimator import create_estimator
+from signal_processor import StreamingLowpass
+
+FRAME_SIZE = 4096
+HOP_SIZE = 1024
+CUTOFF = 450.0
+BATCH_MEMORY_BYTES = 32 * 1024 * 1024  # Memoria de trabajo de cada lote, por proceso
+# Bytes por muestra de frame en estimate_frames (medido con tracemalloc): YinPlan y McLeodPlan guardan por
+# fila varios buffers de FFT de 2× el frame
+FRAME_BYTES_PER_SAMPLE = {"fft": 17, "yin": 100, "mpm": 83}
+# Confianza mínima para asignar nota y cents, como min_confidence en TunerEngine. La de "fft" es la fracción
+# de energía en el pico: ~0.2-0.45 con una nota, < 0.1 con ruido
+MIN_CONFIDENCE = {"fft": 0.2, "yin": 0.8, "mpm": 0.8}
+
+
+def load_wav(path):
+    rate, samples = wavfile.read(path)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if samples.dtype.kind == 'f':
+        # Normalizar al mismo rango que la captura int16 en vivo
+        samples = samples * 32767.0
+    return rate, samples.astype(np.float64)
+
+
+def frame_signal(samples, frame_size, hop_size):
+    if len(samples) < frame_size:
+        return np.empty((0, frame_size))
+    # Vista 2-D sin copias: cada fila es un frame
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_size)
+    return frames[::hop_size]
+
+
+def batch_frames(estimator, frame_size):
+    # Frames por llamada a estimate_frames: limita la memoria en archivos largos (~80 con YIN y 4096 muestras)
+    return max(1, BATCH_MEMORY_BYTES // (frame_size * FRAME_BYTES_PER_SAMPLE[estimator]))
+
+
+def analyze_samples(samples, rate, estimator="yin", frame_size=FRAME_SIZE, hop_size=HOP_SIZE,
+                    a4=A4_FREQUENCY, min_confidence=None):
+    if min_confidence is None:
+        min_confidence = MIN_CONFIDENCE[estimator]
+    # Mismo camino que en vivo: paso-bajo de 450 Hz con estado, luego el estimador
+    filtered = StreamingLowpass(rate, CUTOFF).process(samples) if len(samples) else samples
+    frames = frame_signal(filtered, frame_size, hop_size)
+    pitch_estimator = create_estimator(estimator, rate)
+
+    frequencies = np.full(len(frames), np.nan)
+    confidences = np.zeros(len(frames))
+    batch = batch_frames(estimator, frame_size)
+    for start in range(0, len(frames), batch):
+        stop = start + batch
+        frequencies[start:stop], confidences[start:stop] = pitch_estimator.estimate_frames(frames[start:stop])
+
+    times = (np.arange(len(frames)) * hop_size + frame_size / 2) / rate
+    cents = np.full(len(frames), np.nan)
+    notes = [""] * len(frames)
+    # La frecuencia se guarda siempre; la nota solo si el estimador está seguro (YIN en silencio da ~350 Hz
+    # con confianza 0)
+    valid = np.isfinite(frequencies) & (frequencies > 0) & (confidences >= min_confidence)
+    if valid.any():
+        valid_notes, cents[valid] = nearest_note(frequencies[valid], a4)
+        for index, note in zip(np.flatnonzero(valid), valid_notes):
+            notes[index] = note
+
+    return {
+        "time": times,
+        "frequency": frequencies,
+        "note": np.array(notes),
+        "cents": cents,
+        "confidence": confidences,
+    }
+
+
+def analyze_file(path, estimator="yin", frame_size=FRAME_SIZE, hop_size=HOP_SIZE, a4=A4_FREQUENCY,
+                 min_confidence=None):
+    rate, samples = load_wav(path)
+    return analyze_samples(samples, rate, estimator, frame_size, hop_size, a4, min_confidence)
+
+
+def write_csv(result, output):
+    writer = csv.writer(output)
+    writer.writerow(["time", "frequency", "note", "cents", "confidence"])
+    for row in zip(result["time"], result["frequency"], result["note"], result["cents"], result["confidence"]):
+        time, frequency, note, cents, confidence = row
+        writer.writerow([f"{time:.4f}", f"{frequency:.3f}", note, f"{cents:.2f}", f"{confidence:.3f}"])
+
+
+def output_path(path, output_dir, extension):
+    base = os.path.splitext(os.path.basename(path))[0]
+    directory = output_dir if output_dir else os.path.dirname(path)
+    return os.path.join(directory, f"{base}.pitch.{extension}")
+
+
+def _analyze_and_save(job):
+    path, estimator, frame_size, hop_size, output_format, output_dir, a4, min_confidence = job
+    result = analyze_file(path, estimator, frame_size, hop_size, a4, min_confidence)
+    if output_format == "npz":
+        destination = output_path(path, output_dir, "npz")
+        np.savez(destination, **result)
+    else:
+        destination = output_path(path, output_dir, "csv")
+        with open(destination, "w", newline="") as output:
+            write_csv(result, output)
+    return path, destination, len(result["time"])
+
+
+def analyze_files(paths, estimator="yin", frame_size=FRAME_SIZE, hop_size=HOP_SIZE,
+                  output_format="csv", output_dir=None, workers=None, a4=A4_FREQUENCY, min_confidence=None):
+    jobs = [(path, estimator, frame_size, hop_size, output_format, output_dir, a4, min_confidence)
+            for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, destination, frame_count in executor.map(_analyze_and_save, jobs):
+            yield path, destination, frame_count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis offline de pitch sobre archivos WAV")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyze = subparsers.add_parser("analyze", help="Analizar uno o varios archivos WAV")
+    analyze.add_argument("files", nargs="+")
+    analyze.add_argument("--estimator", default="yin", choices=["fft", "yin", "mpm"])
+    analyze.add_argument("--frame", type=int, default=FRAME_SIZE)
+    analyze.add_argument("--hop", type=int, default=HOP_SIZE)
+    analyze.add_argument("--format", default="csv", choices=["csv", "npz"])
+    analyze.add_argument("--output-dir", default=None)
+    analyze.add_argument("--workers", type=int, default=None)
+    analyze.add_argument("--a4", type=float, default=A4_FREQUENCY, help="Frecuencia de referencia del La4")
+    analyze.add_argument("--min-confidence", type=float, default=None,
+                         help="Confianza mínima para asignar nota (por defecto, según el estimador)")
+
+    args = parser.parse_args(argv)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for path, destination, frame_count in analyze_files(args.files, args.estimator, args.frame, args.hop,
+                                                        args.format, args.output_dir, args.workers,
+                                                        args.a4, args.min_confidence):
+        print(f"{path}: {frame_count} frames → {destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
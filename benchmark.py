@@ -0,0 +1,255 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from noise_gate import NoiseGate
+from synthetic_signal import plucked_string, silence, chunks
+from metrics import Metrics
+from tuner_engine import TunerEngine, REFERENCE_FREQUENCIES
+
+RATE = 22050
+CHUNK = 4096
+HOP_SIZE = 512
+DETUNINGS = [-20.0, -5.0, 0.0, 5.0, 20.0]
+SETTLE_SECONDS = 0.3  # Ignorar el ataque de la nota al medir la precisión
+
+
+def summarize(samples_ns):
+    samples = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    mean = float(np.mean(samples))
+    return {
+        "frames": len(samples),
+        "mean_ms": mean,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "frames_per_second": 1000.0 / mean if mean > 0 else None,
+    }
+
+
+def time_stage(function, frames):
+    timings = []
+    for frame in frames:
+        start = time.perf_counter_ns()
+        function(frame)
+        timings.append(time.perf_counter_ns() - start)
+    return summarize(timings)
+
+
+def benchmark_stages(estimator="yin", frames=300, seed=0):
+    engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=estimator)
+    signal = plucked_string(REFERENCE_FREQUENCIES["A2"], duration=(frames * HOP_SIZE + CHUNK) / RATE,
+                            rate=RATE, noise_level=0.01, hum_level=0.02, seed=seed)
+    hops = list(chunks(signal, HOP_SIZE))
+    windows = [signal[i:i + CHUNK].astype(np.float64) for i in range(0, frames * HOP_SIZE, HOP_SIZE)]
+
+    processor = engine.signal_processor
+    plan = engine.analysis_plan
+    pitch_window = engine.pitch_window
+    targeted = processor.targeted_plan(CHUNK, REFERENCE_FREQUENCIES["A2"], max_freq=engine.cutoff)
+    strobe = processor.strobe_plan(CHUNK)
+
+    def detect(window):
+        plan.analyze(window)
+        frequency, _ = plan.peak()
+        engine.detect_string(frequency)
+
+    stages = {
+        "lowpass_filter": time_stage(lambda window: processor.lowpass_filter(window, engine.cutoff), windows),
+        "streaming_lowpass_hop": time_stage(lambda hop: processor.streaming_lowpass(hop, engine.cutoff), hops),
+        "window_fft": time_stage(plan.analyze, windows),
+        "dominant_freq": time_stage(lambda window: processor.dominant_freq(window), windows),
+        "pitch_estimator": time_stage(lambda window: engine.pitch_estimator.estimate(window[-pitch_window:]), windows),
+        "detect_string": time_stage(detect, windows),
+        "targeted_plan": time_stage(lambda window: (targeted.analyze(window), targeted.peak()), windows),
+        "strobe_plan": time_stage(lambda window: strobe.refine(window, REFERENCE_FREQUENCIES["A2"]), windows),
+    }
+
+    engine.reset()
+    for hop in hops[:CHUNK // HOP_SIZE]:
+        engine.feed(hop)
+    stages["engine_total"] = time_stage(engine.process, hops[CHUNK // HOP_SIZE:])
+
+    # En reposo la puerta de ruido corta el análisis: coste de un salto de silencio con ruido
+    gate = NoiseGate(RATE)
+    stages["noise_gate"] = time_stage(gate.process, hops)
+    idle = silence((frames * HOP_SIZE) / RATE, rate=RATE, noise_level=0.005, seed=seed)
+    gated_engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=estimator, noise_gate=NoiseGate(RATE))
+    stages["engine_idle_gated"] = time_stage(gated_engine.process, list(chunks(idle, HOP_SIZE)))
+    return stages
+
+
+def measure_accuracy(estimator="yin", duration=1.5, noise_level=0.01, hum_level=0.02, seed=0, targeted=False,
+                     strobe=False):
+    # Con targeted=False la cuerda seleccionada no activa TargetedPlan: se mide el estimador, no el banco de DFT
+    accuracy = {}
+    settle_frames = int(SETTLE_SECONDS * RATE / HOP_SIZE)
+
+    for string_key, reference in REFERENCE_FREQUENCIES.items():
+        accuracy[string_key] = {}
+        for cents in DETUNINGS:
+            engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=estimator, targeted=targeted)
+            engine.select_string(string_key)
+            engine.enable_strobe_mode(strobe)
+            signal = plucked_string(reference, duration, RATE, cents=cents, noise_level=noise_level,
+                                    hum_level=hum_level, seed=seed)
+
+            errors = []
+            waiting = 0
+            for index, hop in enumerate(chunks(signal, HOP_SIZE)):
+                result = engine.process(hop)
+                if result is None or index < settle_frames:
+                    continue
+                if result.cents is None:
+                    waiting += 1
+                else:
+                    errors.append(result.cents - cents)
+
+            errors = np.abs(errors)
+            accuracy[string_key][f"{cents:+.0f}"] = {
+                "frames": int(len(errors) + waiting),
+                "missed_frames": waiting,
+                "median_abs_error_cents": float(np.median(errors)) if len(errors) else None,
+                "max_abs_error_cents": float(np.max(errors)) if len(errors) else None,
+            }
+    return accuracy
+
+
+def measure_wrong_string(estimator="yin", duration=1.0, seed=0):
+    # Regresión: con una cuerda seleccionada a mano se pulsa otra. Los armónicos comunes (4·E2 = 3·A2,
+    # 2·D3 = 3·E2 casi) no deben dar una lectura a menos de 100 cents de la cuerda seleccionada
+    wrong = {}
+    for selected in REFERENCE_FREQUENCIES:
+        false_readings = 0
+        for played_key, played in REFERENCE_FREQUENCIES.items():
+            if played_key == selected:
+                continue
+            engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=estimator)
+            engine.select_string(selected)
+            signal = plucked_string(played, duration, RATE, noise_level=0.01, hum_level=0.02, seed=seed)
+            for hop in chunks(signal, HOP_SIZE):
+                result = engine.process(hop)
+                if result is not None and result.cents is not None and abs(result.cents) < 100:
+                    false_readings += 1
+        wrong[selected] = false_readings
+    return wrong
+
+
+def measure_time_to_lock(estimator="yin", seed=0):
+    # Segundos desde la pulsación hasta que la detección automática fija la cuerda
+    lock = {}
+    for string_key, reference in REFERENCE_FREQUENCIES.items():
+        engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=estimator, noise_gate=NoiseGate(RATE))
+        signal = np.concatenate([silence(0.5, RATE, noise_level=0.005, seed=seed),
+                                 plucked_string(reference, 2.0, RATE, noise_level=0.01, hum_level=0.02, seed=seed)])
+        for hop in chunks(signal, HOP_SIZE):
+            engine.process(hop)
+            if engine.auto_locked:
+                break
+        lock[string_key] = {
+            "locked_string": engine.current_string if engine.auto_locked else None,
+            "seconds": engine.lock_time if engine.auto_locked else None,
+        }
+    return lock
+
+
+def measure_repluck(estimator="yin", seed=0, block_size=CHUNK):
+    # Regresión: una segunda pulsación a mitad de un bloque de la tarjeta. Como AnalysisScheduler, se
+    # vacían todos los saltos del bloque y luego se analiza una vez; la pulsación ya vació la ventana
+    metrics = Metrics(enabled=True)
+    engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=estimator, noise_gate=NoiseGate(RATE), metrics=metrics)
+    first = plucked_string(REFERENCE_FREQUENCIES["A2"], 1.0, RATE, noise_level=0.01, seed=seed)
+    second = plucked_string(REFERENCE_FREQUENCIES["A2"], 1.0, RATE, noise_level=0.01, seed=seed + 1)
+    signal = np.concatenate([silence(0.3, RATE, noise_level=0.005, seed=seed),
+                             first[:RATE - block_size // 4], second])
+
+    blocks = results = empty = 0
+    for block in chunks(signal, block_size):
+        blocks += 1
+        windows_ready = sum(1 for hop in chunks(block, HOP_SIZE) if engine.feed(hop))
+        if windows_ready:
+            if engine.analyze() is None:
+                empty += 1
+            else:
+                results += 1
+    return {"blocks": blocks, "onsets": metrics.counters.get("onsets", 0), "results": results,
+            "empty_windows": empty}
+
+
+def run(estimator="yin", frames=300, seed=0):
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "config": {"rate": RATE, "chunk": CHUNK, "hop_size": HOP_SIZE, "estimator": estimator},
+        "stages": benchmark_stages(estimator, frames, seed),
+        "accuracy": measure_accuracy(estimator, seed=seed),
+        "targeted_accuracy": measure_accuracy(estimator, seed=seed, targeted=True),
+        "strobe_accuracy": measure_accuracy(estimator, seed=seed, strobe=True),
+        "wrong_string": measure_wrong_string(estimator, seed=seed),
+        "time_to_lock": measure_time_to_lock(estimator, seed),
+        "repluck": measure_repluck(estimator, seed),
+    }
+
+
+def print_report(report):
+    print(f"Estimador: {report['config']['estimator']}")
+    print(f"{'Etapa':<24}{'fps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in report["stages"].items():
+        print(f"{name:<24}{stats['frames_per_second']:>10.0f}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+
+    for key, title in (("accuracy", "Error (¢)"), ("targeted_accuracy", "Dirigido (¢)"),
+                       ("strobe_accuracy", "Estrobo (¢)")):
+        print()
+        header = "".join(f"{cents:>9}" for cents in next(iter(report[key].values())))
+        print(f"{title:<12}{header}")
+        for string_key, by_detuning in report[key].items():
+            cells = []
+            for stats in by_detuning.values():
+                error = stats["median_abs_error_cents"]
+                cells.append(f"{error:>9.3f}" if error is not None else f"{'---':>9}")
+            print(f"{string_key:<12}{''.join(cells)}")
+
+    cells = [f"{string_key} {count}" for string_key, count in report["wrong_string"].items()]
+    print(f"Otra cuerda (lecturas falsas): {'  '.join(cells)}")
+
+    cells = []
+    for string_key, lock in report["time_to_lock"].items():
+        seconds = f"{lock['seconds']:.2f}" if lock["seconds"] is not None else "---"
+        mark = "" if lock["locked_string"] in (None, string_key) else f"→{lock['locked_string']}"
+        cells.append(f"{string_key} {seconds}{mark}")
+    print(f"Fijar cuerda (s): {'  '.join(cells)}")
+
+    repluck = report["repluck"]
+    print(f"Repulsación a mitad de bloque: {repluck['onsets']} pulsaciones, {repluck['results']} lecturas, "
+          f"{repluck['empty_windows']} ventanas vaciadas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rendimiento y precisión del afinador con señales sintéticas")
+    parser.add_argument("--estimator", action="append", choices=["fft", "yin", "mpm"],
+                        help="Estimador a medir (se puede repetir); por defecto yin")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for estimator in args.estimator or ["yin"]:
+        report = run(estimator, args.frames, args.seed)
+        print_report(report)
+        print()
+        reports.append(report)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(reports, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+import argparse
+import csv
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import traceback
+
+import numpy as np
+
+# Archivo de captura: cabecera fija + muestras int16 crudas; al lado, <ruta>.idx con un
+# registro (primera muestra, instante) por cada bloque recibido
+MAGIC = b"GTCAP\x00\x01\x00"
+HEADER = struct.Struct("<8sdId")   # magic, rate, channels, hora de inicio (epoch)
+HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([("sample", "<u8"), ("time", "<f8")])
+GROW_SECONDS = 60.0
+
+
+class GrowingMemmap:
+    # Array de una dimensión mapeado en disco que crece por tramos al añadir datos
+    def __init__(self, path, dtype, offset, grow):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.offset = offset
+        self.grow = grow
+        self.size = 0
+        self.capacity = 0
+        self.array = None
+
+    def _remap(self, capacity):
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+        with open(self.path, "r+b") as handle:
+            handle.truncate(self.offset + capacity * self.dtype.itemsize)
+        self.array = np.memmap(self.path, dtype=self.dtype, mode="r+", offset=self.offset, shape=(capacity,))
+        self.capacity = capacity
+
+    def append(self, values):
+        count = len(values)
+        if self.size + count > self.capacity:
+            self._remap(max(self.size + count, self.capacity + self.grow))
+        self.array[self.size:self.size + count] = values
+        self.size += count
+
+    def close(self):
+        # Recorta el espacio reservado que no llegó a usarse
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+        with open(self.path, "r+b") as handle:
+            handle.truncate(self.offset + self.size * self.dtype.itemsize)
+
+
+class CaptureWriter:
+    def __init__(self, path, rate, channels=1, clock=time.monotonic):
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self.clock = clock
+        self.start = clock()
+
+        with open(path, "wb") as handle:
+            handle.write(HEADER.pack(MAGIC, float(rate), channels, time.time()).ljust(HEADER_SIZE, b"\x00"))
+        open(path + ".idx", "wb").close()
+
+        grow = int(rate * channels * GROW_SECONDS)
+        self.samples = GrowingMemmap(path, np.int16, HEADER_SIZE, grow)
+        self.index = GrowingMemmap(path + ".idx", INDEX_DTYPE, 0, 4096)
+        self.record = np.zeros(1, dtype=INDEX_DTYPE)
+        self.errors = 0
+        self.last_error = None
+
+        # Crecer el archivo (flush, truncate, nuevo mapeo) es E/S bloqueante: la hace un hilo propio,
+        # nunca el callback de audio
+        self.pending = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, name="capture", daemon=True)
+        self.thread.start()
+
+    def write(self, samples, timestamp=None):
+        # Se llama desde el callback de audio: solo encola el bloque. El del callback es de solo lectura
+        # (np.frombuffer sobre los bytes de PyAudio) y no hace falta copiarlo
+        if timestamp is None:
+            timestamp = self.clock()
+        if samples.flags.writeable:
+            samples = samples.copy()  # Quien llama puede reutilizar su buffer
+        self.pending.put((samples, timestamp))
+
+    def run(self):
+        while True:
+            block = self.pending.get()
+            if block is None:
+                return
+            samples, timestamp = block
+            try:
+                self.record["sample"] = self.samples.size
+                self.record["time"] = timestamp - self.start
+                self.index.append(self.record)
+                self.samples.append(samples)
+            except Exception as error:
+                # Disco lleno o similar: se pierde la captura, no el audio del afinador
+                self.errors += 1
+                self.last_error = error
+                if self.errors == 1:
+                    traceback.print_exc()
+
+    def close(self):
+        # Termina de escribir lo encolado antes de recortar los archivos
+        self.pending.put(None)
+        self.thread.join()
+        self.samples.close()
+        self.index.close()
+
+
+class CaptureReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as handle:
+            magic, rate, channels, started = HEADER.unpack(handle.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"No es un archivo de captura: {path!r}")
+        self.rate = rate
+        self.channels = channels
+        self.started = started
+
+        # Solo se mapean: las sesiones largas no se cargan en memoria
+        count = (os.path.getsize(path) - HEADER_SIZE) // 2
+        self.samples = np.memmap(path, dtype=np.int16, mode="r", offset=HEADER_SIZE, shape=(count,))
+        index_count = os.path.getsize(path + ".idx") // INDEX_DTYPE.itemsize
+        if index_count:
+            index = np.memmap(path + ".idx", dtype=INDEX_DTYPE, mode="r", shape=(index_count,))
+        else:
+            index = np.zeros(0, dtype=INDEX_DTYPE)
+        self.block_samples = np.asarray(index["sample"], dtype=np.int64)
+        self.block_times = np.asarray(index["time"], dtype=np.float64)
+
+    @property
+    def duration(self):
+        return len(self.samples) / (self.rate * self.channels)
+
+    def samples_at(self, elapsed):
+        # Muestras ya recibidas a los `elapsed` segundos de sesión, bloque a bloque como llegaron
+        blocks = int(np.searchsorted(self.block_times, elapsed, side="right"))
+        if blocks >= len(self.block_samples):
+            return len(self.samples)
+        return int(self.block_samples[blocks])
+
+
+class ReplayStream:
+    # Misma interfaz que AudioStream (wait, read, read_latest, stats, close) sobre una captura
+    STATS_GAUGES = ()  # replayed_samples solo crece: contador
+
+    def __init__(self, path, chunk=4096, realtime=True, clock=time.monotonic):
+        self.reader = CaptureReader(path)
+        self.rate = self.reader.rate
+        self.chunk = chunk
+        self.realtime = realtime
+        self.clock = clock
+        self.start = None
+        self.read_index = 0
+        self.total_samples = len(self.reader.samples)
+        self.channels = self.reader.channels
+        self.interleaved = np.zeros(0, dtype=np.int16)
+        self.released = 0  # Sin tiempo real: muestras ya "entregadas"
+        self.waited = False
+
+    def release(self):
+        self.released = min(self.total_samples, self.released + self.chunk * self.channels)
+
+    def available_index(self):
+        if not self.realtime:
+            # Lo más rápido posible, pero bloque a bloque: cada wait() entrega `chunk` frames, como el callback
+            # del micrófono, así un paso del planificador no vacía la captura entera. A un stream al que nadie
+            # espera (los demás de una estación) se le entrega el siguiente bloque al leer el anterior
+            if not self.waited and self.read_index >= self.released:
+                self.release()
+            return self.released
+        if self.start is None:
+            self.start = self.clock()
+        return self.reader.samples_at(self.clock() - self.start)
+
+    def exhausted(self, frames=None):
+        # Ya no llegará ningún bloque completo de `frames` muestras
+        if frames is None:
+            frames = self.chunk
+        return self.read_index + frames > self.total_samples
+
+    def wait(self, timeout=None):
+        # Como AudioStream.wait: en tiempo real duerme hasta que "llega" el siguiente bloque de la captura
+        if not self.realtime:
+            self.waited = True
+            if self.released < self.total_samples:
+                self.release()
+                return True
+            time.sleep(timeout or 0)
+            return False
+        if self.start is None:
+            self.start = self.clock()
+        elapsed = self.clock() - self.start
+        arrived = int(np.searchsorted(self.reader.block_times, elapsed, side="right"))
+        if arrived < len(self.reader.block_times):
+            delay = max(0.0, self.reader.block_times[arrived] - elapsed)
+            if timeout is None or delay <= timeout:
+                time.sleep(delay)
+                return True
+        time.sleep(timeout or 0)
+        return False
+
+    def read(self, frames=None):
+        if frames is None:
+            frames = self.chunk
+        if self.read_index + frames > self.available_index():
+            return None
+        data = self.reader.samples[self.read_index:self.read_index + frames].tobytes()
+        self.read_index += frames
+        return data
+
+    def read_into(self, out):
+        frames = len(out)
+        if self.read_index + frames > self.available_index():
+            return None
+        np.copyto(out, self.reader.samples[self.read_index:self.read_index + frames])
+        self.read_index += frames
+        return out
+
+    def available(self):
+        # Frames (muestras por canal) que ya "llegaron" y no se han leído
+        return (self.available_index() - self.read_index) // self.channels
+
+    def read_channels(self, out):
+        # Como AudioStream.read_channels: bloque desentrelazado de forma (canales, frames)
+        if len(self.interleaved) != out.size:
+            self.interleaved = np.empty(out.size, dtype=np.int16)
+        if self.read_into(self.interleaved) is None:
+            return None
+        np.copyto(out, self.interleaved.reshape(-1, self.channels).T)
+        return out
+
+    def read_latest(self, count, out=None):
+        end = self.available_index() if self.realtime else self.read_index
+        if end < count:
+            return None
+        if out is None:
+            out = np.empty(count, dtype=np.int16)
+        np.copyto(out, self.reader.samples[end - count:end], casting='unsafe')
+        return out
+
+    def stats(self):
+        return {"replayed_samples": self.read_index}
+
+    def close(self):
+        self.reader = None
+
+
+def replay(path, estimator="yin", hop_size=512, realtime=False, output=None, noise_gate=True):
+    # Solo la línea de comandos necesita el motor: audio_stream importa este módulo para grabar
+    from noise_gate import NoiseGate
+    from tuner_engine import TunerEngine
+
+    stream = ReplayStream(path, realtime=realtime)
+    # Mismo camino que la GUI: sin puerta no hay pulsaciones y la cuerda fijada no se suelta nunca
+    rate = int(stream.rate)
+    engine = TunerEngine(rate, estimator=estimator, hop_size=hop_size,
+                         noise_gate=NoiseGate(rate) if noise_gate else None)
+    writer = csv.writer(output or sys.stdout)
+    writer.writerow(["time", "string", "frequency", "cents", "status"])
+
+    hops = 0
+    hop = np.empty(hop_size, dtype=np.int16)
+    while not stream.exhausted(hop_size):
+        if stream.read_into(hop) is None:
+            # Solo en tiempo real: el bloque aún no "ha llegado"
+            time.sleep(hop_size / stream.rate / 2)
+            continue
+        hops += 1
+        result = engine.process(hop)
+        if result is not None:
+            frequency = "" if result.frequency is None else f"{result.frequency:.3f}"
+            cents = "" if result.cents is None else f"{result.cents:.2f}"
+            writer.writerow([f"{hops * hop_size / stream.rate:.4f}", result.string, frequency, cents,
+                             result.status])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproducción de sesiones capturadas")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    info = subparsers.add_parser("info", help="Datos de una captura")
+    info.add_argument("file")
+
+    play = subparsers.add_parser("replay", help="Pasar una captura por el motor de afinación (CSV por stdout)")
+    play.add_argument("file")
+    play.add_argument("--estimator", default="yin", choices=["fft", "yin", "mpm"])
+    play.add_argument("--hop", type=int, default=512)
+    play.add_argument("--realtime", action="store_true", help="Respetar los tiempos de la captura")
+    play.add_argument("--no-gate", action="store_true", help="Sin puerta de ruido: analizar también en silencio")
+    play.add_argument("--output", default=None, help="Archivo CSV (por defecto, salida estándar)")
+
+    args = parser.parse_args(argv)
+    if args.command == "info":
+        reader = CaptureReader(args.file)
+        print(f"{args.file}: {reader.rate:g} Hz, {reader.channels} canal(es), {reader.duration:.2f} s, "
+              f"{len(reader.block_samples)} bloques, inicio {time.ctime(reader.started)}")
+        return 0
+
+    if args.output:
+        with open(args.output, "w", newline="") as output:
+            replay(args.file, args.estimator, args.hop, args.realtime, output, not args.no_gate)
+    else:
+        replay(args.file, args.estimator, args.hop, args.realtime, noise_gate=not args.no_gate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,16 @@
-import tkinter as tk
-import numpy as np
-from audio_stream import AudioStream
-from signal_processor import SignalProcessor
-from visualizer import AudioVisualizer
-import math
+import time
 
-REFERENCE_FREQUENCIES = {
-    "E4": 329.63,  # 1ª cuerda (más aguda)
-    "B3": 246.94,  # 2ª cuerda
-    "G3": 196.00,  # 3ª cuerda
-    "D3": 146.83,  # 4ª cuerda
-    "A2": 110.00,  # 5ª cuerda
-    "E2": 82.41    # 6ª cuerda (más grave)
-}
+STARTED = time.perf_counter()  # Antes del resto de imports: el arranque medido los incluye
+
+import importlib
+import math
+import threading
+import tkinter as tk
+from analysis_scheduler import AnalysisScheduler
+from capture import ReplayStream
+from metrics import Metrics
+from noise_gate import NoiseGate
+from tuner_engine import TunerEngine, STATUS_WAITING, STATUS_IN_TUNE, STATUS_SHARP
 
 STRING_NAMES = {
     "E4": "1ª cuerda (Mi agudo)",
@@ -23,14 +21,53 @@ STRING_NAMES = {
     "E2": "6ª cuerda (Mi grave)"
 }
 
+SOLFEGE = {"C": "Do", "C#": "Do#", "D": "Re", "D#": "Re#", "E": "Mi", "F": "Fa", "F#": "Fa#",
+           "G": "Sol", "G#": "Sol#", "A": "La", "A#": "La#", "B": "Si"}
+
 FORMAT = 8  # pyaudio.paInt16
 CHANNELS = 1
 RATE = 22050
 CHUNK = 4096
+HOP_SIZE = 512
+AUDIO_WAIT_TIMEOUT = 0.05   # El análisis se despierta al llegar audio; esto solo acota la espera
+DISPLAY_MAX_FPS = 30        # Refresco de aguja y etiquetas; los resultados intermedios se descartan
+PITCH_ESTIMATOR = "yin"
+TUNING = "standard"     # Ver note_table.TUNINGS: drop_d, dadgad, open_g, seven_string, bass...
+A4_FREQUENCY = 440.0
+PITCH_WINDOW = 2048
+MIN_CONFIDENCE = 0.8
+DECIMATION = 1          # 8 analiza a ~2756 Hz: menos coste, YIN algo menos preciso
+NOISE_GATE = True       # Sin señal no se analiza: el bucle en reposo casi no consume CPU
+CAPTURE_PATH = None     # p. ej. "sesion.gtcap": graba el audio crudo con marcas de tiempo
+REPLAY_PATH = None      # Reproduce una captura en lugar del micrófono
+REPLAY_REALTIME = True  # False: lo más rápido posible
+PLOT_MAX_FPS = 20
+WATERFALL_COLUMNS = 200     # Cascada: una columna por refresco de pantalla (~6.7 s a DISPLAY_MAX_FPS); 0 la desactiva
+PLOT_PANEL = "deferred"     # "deferred": gráficos en cuanto matplotlib carga en segundo plano; "on_demand": con un botón; None: sin gráficos
+STARTUP_BUDGET_SECONDS = 1.0  # Aviso si la ventana tarda más en aparecer
+STARTUP_REPORT = False        # Imprimir también los tiempos que no superan el presupuesto
+STROBE_SEGMENTS = 12    # Franjas del disco estroboscópico: una franja avanza por cada ciclo de batido
+METRICS_ENABLED = False
+METRICS_OVERLAY = True       # Mostrar tiempos por etapa en la ventana
+METRICS_STDOUT = False       # Imprimir el resumen periódicamente por consola
+METRICS_INTERVAL_MS = 1000
+METRICS_DUMP_PATH = None     # p. ej. "metrics.json" o "metrics.prom" al cerrar
 TOLERANCE = 1.0
 
+def preload_modules(names, loaded):
+    # En segundo plano: los imports pesados no retrasan la ventana ni el primer INICIAR
+    try:
+        for name in names:
+            importlib.import_module(name)
+    finally:
+        loaded.set()
+
+
 class GuitarTunerGUI:
-    def __init__(self, root):
+    def __init__(self, root, started=None):
+        # started: time.perf_counter() al arrancar el proceso (main.py) para medir el arranque completo
+        self.started = started if started is not None else time.perf_counter()
+        self.startup = {}
         self.root = root
         self.root.title("Afinador de Guitarra")
         self.root.geometry("1200x850")
@@ -38,20 +75,100 @@ class GuitarTunerGUI:
         self.root.configure(bg="#0a0a0a")
 
         self.is_tuning = False
-        self.audio_stream = AudioStream(FORMAT, CHANNELS, RATE, CHUNK)
-        self.signal_processor = SignalProcessor(RATE)
-
-        self.current_string = tk.StringVar(value="E4")
+        self.metrics = Metrics(enabled=METRICS_ENABLED)
+        # scipy.signal (primer filtro) y matplotlib (gráficos) se importan mientras la ventana ya se ve
+        preload = ["scipy.signal"]
+        if PLOT_PANEL == "deferred":
+            preload.append("visualizer")
+        self.preloaded = threading.Event()
+        threading.Thread(target=preload_modules, args=(preload, self.preloaded), name="preload",
+                         daemon=True).start()
+
+        # El micrófono se abre en segundo plano al primer INICIAR (PyAudio tarda en algunos equipos)
+        self.audio_stream = None
+        self.audio_opener = None
+        self.audio_error = None
+        if REPLAY_PATH:
+            self.audio_stream = ReplayStream(REPLAY_PATH, CHUNK, realtime=REPLAY_REALTIME)
+            if self.audio_stream.rate != RATE:
+                raise ValueError(f"La captura está a {self.audio_stream.rate:g} Hz y el afinador a {RATE} Hz")
+            self.metrics.add_source(self.audio_stream.stats, self.audio_stream.STATS_GAUGES)
+        self.tuner_engine = TunerEngine(RATE, CHUNK, HOP_SIZE, estimator=PITCH_ESTIMATOR,
+                                        pitch_window=PITCH_WINDOW, min_confidence=MIN_CONFIDENCE,
+                                        metrics=self.metrics, tuning=TUNING, a4=A4_FREQUENCY,
+                                        decimation=DECIMATION,
+                                        noise_gate=NoiseGate(RATE) if NOISE_GATE else None)
+        # Análisis en su propio hilo; la interfaz solo recoge el resultado más reciente. Sin micrófono abierto
+        # aún, el stream se asigna en attach_audio()
+        self.scheduler = AnalysisScheduler(self.audio_stream, self.tuner_engine, HOP_SIZE,
+                                           wait_timeout=AUDIO_WAIT_TIMEOUT, metrics=self.metrics)
+        self.string_names = self.build_string_names()
+
+        self.current_string = tk.StringVar(value=self.tuner_engine.current_string)
         self.current_frequency = 0.0
         self.tuning_status = "---"
         self.tuning_offset = 0.0
 
         self.auto_detect_mode = True
-        self.detection_frames = 0
-        self.transition_threshold = 20
+        self.locked_string = None  # Cuerda fijada por el motor en modo automático
+        self.strobe_reading = None  # (fase, batido en Hz, instante) del último resultado con estroboscopio
+        self.waiting = True  # El último resultado fue de espera: la cascada se va apagando
+        self.label_state = {}
 
         self.setup_ui()
 
+        self.mark_startup("ui")
+        # Tras el primer dibujado de la ventana: la aguja ya se ve
+        self.root.after_idle(self.on_window_shown)
+
+    def mark_startup(self, stage, since=None):
+        # Segundos desde el arranque del proceso, o desde `since` para etapas que empiezan después (audio)
+        seconds = time.perf_counter() - (self.started if since is None else since)
+        self.startup[stage] = seconds
+        self.metrics.observe(f"startup_{stage}", seconds)
+        if stage == "window" and seconds > STARTUP_BUDGET_SECONDS:
+            self.metrics.increment("startup_over_budget")
+            # El aviso no depende de METRICS_ENABLED: con la configuración por defecto es la única señal
+            stages = ", ".join(f"{name} {value:.2f} s" for name, value in self.startup.items())
+            print(f"Arranque lento: presupuesto de {STARTUP_BUDGET_SECONDS:.1f} s superado ({stages})")
+        elif STARTUP_REPORT:
+            print(f"Arranque: {stage} {seconds:.2f} s")
+
+    def on_window_shown(self):
+        self.mark_startup("window")
+        if PLOT_PANEL == "deferred":
+            self.wait_for_plots()
+
+    def wait_for_plots(self):
+        # Sondeo barato desde Tk: la figura se crea en este hilo cuando matplotlib ya está importado
+        if self.preloaded.is_set():
+            self.build_plots()
+        else:
+            self.root.after(50, self.wait_for_plots)
+
+    def build_plots(self):
+        if self.visualizer is not None:
+            return
+        from visualizer import AudioVisualizer
+        if self.plot_button is not None:
+            self.plot_button.destroy()
+            self.plot_button = None
+        self.visualizer = AudioVisualizer(self.graphs_frame, rate=RATE, chunk=CHUNK,
+                                          min_freq=self.tuner_engine.min_freq, max_freq=self.tuner_engine.max_freq,
+                                          max_fps=PLOT_MAX_FPS, metrics=self.metrics,
+                                          waterfall_columns=WATERFALL_COLUMNS, waterfall_fps=DISPLAY_MAX_FPS)
+        self.mark_startup("plots")
+
+    def build_string_names(self):
+        keys = self.tuner_engine.note_table.keys
+        if self.tuner_engine.tuning == "standard":
+            return {key: STRING_NAMES[key] for key in keys}
+        names = {}
+        for index, key in enumerate(keys):
+            pitch = key.rstrip("-0123456789")
+            names[key] = f"{index + 1}ª cuerda ({SOLFEGE.get(pitch, pitch)})"
+        return names
+
     def setup_ui(self):
         main_frame = tk.Frame(self.root, bg="#0a0a0a")
         main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
@@ -60,11 +177,18 @@ class GuitarTunerGUI:
                                bg="#0a0a0a", fg="#00d9ff")
         title_label.pack(pady=(0, 10))
 
-        graphs_frame = tk.Frame(main_frame, bg="#0a0a0a", height=250)
-        graphs_frame.pack(fill=tk.BOTH, expand=False, pady=(0, 10))
-        graphs_frame.pack_propagate(False)  # Mantener altura fija
+        self.graphs_frame = tk.Frame(main_frame, bg="#0a0a0a", height=250)
+        self.graphs_frame.pack(fill=tk.BOTH, expand=False, pady=(0, 10))
+        self.graphs_frame.pack_propagate(False)  # Mantener altura fija
 
-        self.visualizer = AudioVisualizer(graphs_frame, rate=RATE, chunk=CHUNK)
+        # La figura de matplotlib no se construye aquí: build_plots() la crea tras mostrar la ventana
+        self.visualizer = None
+        self.plot_button = None
+        if PLOT_PANEL == "on_demand":
+            self.plot_button = tk.Button(self.graphs_frame, text="📈 MOSTRAR GRÁFICOS", font=("Helvetica", 11, "bold"),
+                                         bg="#333333", fg="#00d9ff", activebackground="#00d9ff",
+                                         activeforeground="#0a0a0a", command=self.build_plots)
+            self.plot_button.pack(expand=True)
 
         content_frame = tk.Frame(main_frame, bg="#0a0a0a")
         content_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
@@ -89,9 +213,9 @@ class GuitarTunerGUI:
         self.guitar_canvas.pack(pady=5, fill=tk.BOTH, expand=True)
         self.guitar_canvas.bind("<Button-1>", self.on_guitar_click)
         self.guitar_canvas.bind("<Motion>", self.on_guitar_hover)
-        self.draw_guitar()
-        self.guitar_canvas.bind("<Motion>", self.on_guitar_hover)
-        self.draw_guitar()
+        # Los elementos se crean una vez y solo se recolocan al cambiar de tamaño
+        self.guitar_canvas.bind("<Configure>", self.on_guitar_resize)
+        self.layout_guitar()
 
         right_frame = tk.Frame(content_frame, bg="#0a0a0a")
         right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(10, 0))
@@ -103,9 +227,10 @@ class GuitarTunerGUI:
         self.tuner_canvas = tk.Canvas(right_frame, bg="#1a1a1a", width=350, height=200,
                                       highlightbackground="#00d9ff", highlightthickness=2)
         self.tuner_canvas.pack(pady=5, fill=tk.BOTH, expand=True)
+        self.tuner_canvas.bind("<Configure>", self.on_tuner_resize)
         self.draw_tuner()
 
-        self.string_info_label = tk.Label(right_frame, text="Cuerda: E4 (1ª cuerda)",
+        self.string_info_label = tk.Label(right_frame, text=f"Cuerda: {self.tuner_engine.current_string} (1ª cuerda)",
                                          font=("Helvetica", 10, "bold"), bg="#0a0a0a", fg="#00ffaa")
         self.string_info_label.pack(pady=3)
 
@@ -117,6 +242,11 @@ class GuitarTunerGUI:
                                     font=("Helvetica", 9, "bold"), bg="#0a0a0a", fg="#888888")
         self.status_label.pack(pady=3)
 
+        if self.metrics.enabled and METRICS_OVERLAY:
+            self.metrics_label = tk.Label(right_frame, text="", font=("Courier", 8), bg="#0a0a0a",
+                                          fg="#666666", wraplength=350, justify=tk.LEFT)
+            self.metrics_label.pack(pady=3)
+
         button_frame = tk.Frame(self.root, bg="#0a0a0a", height=70)
         button_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
 
@@ -126,6 +256,18 @@ class GuitarTunerGUI:
                                      command=self.control_tuning, border=2, relief=tk.RAISED)
         self.start_button.pack(side=tk.LEFT, padx=15, pady=10)
 
+        self.strum_button = tk.Button(button_frame, text="♫ RASGUEO", font=("Helvetica", 12, "bold"),
+                                      bg="#333333", fg="#00ffaa", padx=35, pady=12,
+                                      activebackground="#00ffaa", activeforeground="#0a0a0a",
+                                      command=self.toggle_strum_mode, border=2, relief=tk.RAISED)
+        self.strum_button.pack(side=tk.LEFT, padx=15, pady=10)
+
+        self.strobe_button = tk.Button(button_frame, text="◎ ESTROBO", font=("Helvetica", 12, "bold"),
+                                       bg="#333333", fg="#00ffaa", padx=35, pady=12,
+                                       activebackground="#00ffaa", activeforeground="#0a0a0a",
+                                       command=self.toggle_strobe_mode, border=2, relief=tk.RAISED)
+        self.strobe_button.pack(side=tk.LEFT, padx=15, pady=10)
+
         close_button = tk.Button(button_frame, text="✕ SALIR", font=("Helvetica", 12, "bold"),
                                 bg="#ff3333", fg="#ffffff", padx=35, pady=12,
                                 activebackground="#ff6666", activeforeground="#ffffff",
@@ -134,11 +276,15 @@ class GuitarTunerGUI:
 
     def select_string(self, string_key):
         self.current_string.set(string_key)
-        self.string_info_label.config(text=f"Cuerda: {string_key} ({STRING_NAMES[string_key]}) ✓ Seleccionada")
+        self.set_label(self.string_info_label, f"Cuerda: {string_key} ({self.string_names[string_key]}) ✓ Seleccionada")
 
+        if self.tuner_engine.strum_mode:
+            # Elegir una cuerda vuelve a la afinación de una sola cuerda
+            self.toggle_strum_mode()
+        with self.scheduler.lock:
+            self.tuner_engine.select_string(string_key)
         if self.auto_detect_mode:
             self.auto_detect_mode = False
-            self.detection_frames = 0
             self.update_mode_label()
 
         self.draw_guitar()
@@ -150,7 +296,7 @@ class GuitarTunerGUI:
                     self.select_string(string_key)
                     return
 
-        self.string_info_label.config(text="Haz clic más cercano a una cuerda", fg="#ff9900")
+        self.set_label(self.string_info_label, "Haz clic más cercano a una cuerda", "#ff9900")
 
     def on_guitar_hover(self, event):
         if hasattr(self, 'string_positions') and self.string_positions:
@@ -161,28 +307,20 @@ class GuitarTunerGUI:
             self.guitar_canvas.config(cursor="arrow")
 
     def update_mode_label(self):
-        if self.auto_detect_mode:
+        if self.tuner_engine.strum_mode:
+            self.mode_label.config(text=f"[RASGUEO: {len(self.string_names)} CUERDAS]", fg="#00d9ff")
+        elif self.auto_detect_mode:
             self.mode_label.config(text="[DETECCIÓN AUTOMÁTICA]", fg="#00ff66")
         else:
             self.mode_label.config(text="[SELECCIÓN MANUAL]", fg="#ffaa00")
 
-    def detect_string(self, frequency):
-        if frequency is None or frequency <= 0:
-            return None
-
-        min_distance = float('inf')
-        detected_string = None
-
-        for string_key, reference_freq in REFERENCE_FREQUENCIES.items():
-            cents_diff = abs(1200 * math.log2(frequency / reference_freq))
+    def on_guitar_resize(self, event):
+        self.layout_guitar()
 
-            if cents_diff < min_distance and cents_diff < 150:
-                min_distance = cents_diff
-                detected_string = string_key
-
-        return detected_string
+    def on_tuner_resize(self, event):
+        self.draw_tuner()
 
-    def draw_guitar(self):
+    def layout_guitar(self):
         canvas = self.guitar_canvas
         canvas.delete("all")
 
@@ -213,44 +351,128 @@ class GuitarTunerGUI:
             if i > 0:
                 canvas.create_text(x, guitar_top - 15, text=str(i), font=("Helvetica", 8), fill="#888888")
 
-        string_keys = list(REFERENCE_FREQUENCIES.keys())
+        string_keys = self.tuner_engine.note_table.keys
         start_y = guitar_top
         end_y = guitar_bottom
-        string_spacing = (end_y - start_y) / 5
+        string_spacing = (end_y - start_y) / max(1, len(string_keys) - 1)
 
         self.string_positions = []
+        self.string_items = {}
+        self.strum_items = {}
+        self.strum_state = {}
 
-        string_colors = ["#ff0080", "#ff3300", "#ff6600", "#ffaa00", "#ffdd00", "#ffff00"]
-        string_widths = [5, 5, 4, 4, 3, 3]  # Cuerdas más gruesas para mejor visibilidad
-
-        selected_string = self.current_string.get()
         for idx, string_key in enumerate(string_keys):
             string_y = start_y + (idx * string_spacing)
             self.string_positions.append((string_key, string_y))
 
-            if string_key == selected_string:
-                canvas.create_rectangle(guitar_left - 5, string_y - 25, guitar_right + 5, string_y + 25,
-                                      fill="#004444", outline="#00ffff", width=3)
-                color = "#00ffff"
-                width = string_widths[idx] + 2
-            else:
-                canvas.create_rectangle(guitar_left - 5, string_y - 25, guitar_right + 5, string_y + 25,
-                                      fill="#1a1a1a", outline="#333333", width=1)
-                color = string_colors[idx]
-                width = string_widths[idx]
-
-            canvas.create_line(guitar_left, string_y, guitar_right, string_y,
-                             fill=color, width=width)
+            background = canvas.create_rectangle(guitar_left - 5, string_y - 25, guitar_right + 5, string_y + 25)
+            line = canvas.create_line(guitar_left, string_y, guitar_right, string_y)
+            self.string_items[string_key] = (idx, background, line)
 
             canvas.create_text(15, string_y, text=string_key,
                              font=("Helvetica", 12, "bold"), fill="#00ffff")
 
-            canvas.create_text(canvas_width - 15, string_y, text=STRING_NAMES[string_key],
+            # Lectura por cuerda del modo rasgueo (vacía en los otros modos)
+            self.strum_items[string_key] = canvas.create_text(guitar_left + 10, string_y - 14, text="",
+                                                              font=("Helvetica", 10, "bold"), anchor="w")
+
+            canvas.create_text(canvas_width - 15, string_y, text=self.string_names[string_key],
                              font=("Helvetica", 11), fill="#00ffaa", anchor="e")
 
         canvas.create_rectangle(5, 5, canvas_width - 5, canvas_height - 5,
                                outline="#00d9ff", width=2)
 
+        # Forzar que draw_guitar aplique el estado a los elementos nuevos
+        self.drawn_string = None
+        self.draw_guitar()
+
+    def style_string(self, string_key, selected):
+        idx, background, line = self.string_items[string_key]
+        string_colors = ["#ff0080", "#ff3300", "#ff6600", "#ffaa00", "#ffdd00", "#ffff00"]
+        string_widths = [5, 5, 4, 4, 3, 3]  # Cuerdas más gruesas para mejor visibilidad
+        # Afinaciones con más de seis cuerdas repiten el estilo de la última
+        idx = min(idx, len(string_colors) - 1)
+
+        if selected:
+            self.guitar_canvas.itemconfig(background, fill="#004444", outline="#00ffff", width=3)
+            self.guitar_canvas.itemconfig(line, fill="#00ffff", width=string_widths[idx] + 2)
+        else:
+            self.guitar_canvas.itemconfig(background, fill="#1a1a1a", outline="#333333", width=1)
+            self.guitar_canvas.itemconfig(line, fill=string_colors[idx], width=string_widths[idx])
+
+    def draw_guitar(self):
+        # Solo se tocan los elementos de la cuerda que cambia de estado
+        selected_string = self.current_string.get()
+        if selected_string == self.drawn_string:
+            return
+
+        if self.drawn_string is None:
+            for string_key in self.string_items:
+                self.style_string(string_key, string_key == selected_string)
+        else:
+            self.style_string(self.drawn_string, False)
+            self.style_string(selected_string, True)
+        self.drawn_string = selected_string
+
+    def show_strum(self, readings):
+        # Estado simultáneo de todas las cuerdas; solo se reconfiguran las que cambian
+        for reading in readings:
+            if reading.cents is None:
+                state = ("", None)
+            else:
+                color = "#00ff66" if reading.status == STATUS_IN_TUNE else "#ff3333"
+                state = (f"{reading.cents:+.1f}¢", color)
+
+            if self.strum_state.get(reading.string) == state:
+                continue
+            self.strum_state[reading.string] = state
+
+            idx, background, line = self.string_items[reading.string]
+            text, color = state
+            if color is None:
+                self.guitar_canvas.itemconfig(self.strum_items[reading.string], text="")
+                self.guitar_canvas.itemconfig(background, fill="#1a1a1a", outline="#333333", width=1)
+            else:
+                self.guitar_canvas.itemconfig(self.strum_items[reading.string], text=text, fill=color)
+                self.guitar_canvas.itemconfig(background, fill="#1a1a1a", outline=color, width=2)
+
+    def clear_strum(self):
+        for string_key, item in self.strum_items.items():
+            self.guitar_canvas.itemconfig(item, text="")
+        self.strum_state = {}
+        # Volver a aplicar el estilo de selección a todas las cuerdas
+        self.drawn_string = None
+        self.draw_guitar()
+
+    def toggle_strum_mode(self):
+        enabled = not self.tuner_engine.strum_mode
+        if enabled and self.tuner_engine.strobe_mode:
+            # El estroboscopio solo tiene sentido con una cuerda
+            self.toggle_strobe_mode()
+        with self.scheduler.lock:
+            self.tuner_engine.enable_strum_mode(enabled)
+        if enabled:
+            self.strum_button.configure(bg="#00ffaa", fg="#0a0a0a")
+            self.strum_state = {}
+        else:
+            self.strum_button.configure(bg="#333333", fg="#00ffaa")
+            self.clear_strum()
+        self.update_mode_label()
+
+    def toggle_strobe_mode(self):
+        enabled = not self.tuner_engine.strobe_mode
+        if enabled and self.tuner_engine.strum_mode:
+            self.toggle_strum_mode()
+        with self.scheduler.lock:
+            self.tuner_engine.enable_strobe_mode(enabled)
+        self.strobe_reading = None
+        self.strobe_offset = None
+        self.tuner_canvas.itemconfig("strobe", state=tk.NORMAL if enabled else tk.HIDDEN)
+        if enabled:
+            self.strobe_button.configure(bg="#00ffaa", fg="#0a0a0a")
+        else:
+            self.strobe_button.configure(bg="#333333", fg="#00ffaa")
+
     def draw_tuner(self):
         canvas = self.tuner_canvas
         canvas.delete("all")
@@ -308,195 +530,272 @@ class GuitarTunerGUI:
         canvas.create_text(bar_left + 2.5*zone_width, bar_top + bar_height + 20,
                           text="ALTA", font=("Helvetica", 9, "bold"), fill="#ff3333")
 
+        # La aguja se crea una sola vez por layout y luego solo se mueve
+        self.needle_head = canvas.create_polygon(0, 0, 0, 0, 0, 0, fill="#ffff00", outline="#ffff00", tags="needle")
+        self.needle_line = canvas.create_line(0, 0, 0, 0, fill="#ffff00", width=2, tags="needle")
+        self.needle_x = None
         self.draw_tuner_needle(canvas, center_x, bar_top, bar_bottom)
 
         info_y = 130
 
         canvas.create_text(15, info_y, text="Offset:", font=("Helvetica", 9), fill="#888888", anchor="w")
-        self.offset_label = tk.Label(self.root, text="0.0¢", font=("Helvetica", 10, "bold"),
-                                    bg="#0f0f0f", fg="#ffff00")
+        if not hasattr(self, 'offset_label'):
+            self.offset_label = tk.Label(self.root, text="0.0¢", font=("Helvetica", 10, "bold"),
+                                        bg="#0f0f0f", fg="#ffff00")
 
         canvas.create_line(15, info_y + 25, canvas_width - 15, info_y + 25,
                           fill="#444444", width=1)
 
+        # Disco estroboscópico: las franjas se crean una vez y solo cambia su ángulo de inicio
+        radius = max(20, min(60, (canvas_height - info_y - 45) / 2))
+        center_y = info_y + 35 + radius
+        state = tk.NORMAL if self.tuner_engine.strobe_mode else tk.HIDDEN
+        canvas.create_oval(canvas_width / 2 - radius, center_y - radius, canvas_width / 2 + radius,
+                           center_y + radius, outline="#444444", width=1, state=state, tags="strobe")
+        self.strobe_arcs = []
+        for index in range(STROBE_SEGMENTS):
+            self.strobe_arcs.append(canvas.create_arc(
+                canvas_width / 2 - radius, center_y - radius, canvas_width / 2 + radius, center_y + radius,
+                start=index * 360 / STROBE_SEGMENTS, extent=180 / STROBE_SEGMENTS, style=tk.ARC,
+                outline="#555555", width=max(4, radius / 4), state=state, tags="strobe"))
+        self.strobe_offset = None
+        self.strobe_color = None
+
     def draw_tuner_needle(self, canvas, x, top, bottom):
-        canvas.delete("needle")
+        # Evitar trabajo de Tk si la aguja no se movió al menos medio píxel
+        if self.needle_x is not None and abs(x - self.needle_x) < 0.5:
+            return
+        self.needle_x = x
 
-        height = bottom - top + 20
-        points = [x, top - 10, x - 6, top + 8, x + 6, top + 8]
-        canvas.create_polygon(points, fill="#ffff00", outline="#ffff00", tags="needle")
+        canvas.coords(self.needle_head, x, top - 10, x - 6, top + 8, x + 6, top + 8)
+        canvas.coords(self.needle_line, x, top, x, bottom + 5)
 
-        canvas.create_line(x, top, x, bottom + 5, fill="#ffff00", width=2, tags="needle")
+    def draw_strobe(self):
+        # Entre resultados el disco sigue girando al ritmo del último batido: movimiento continuo a DISPLAY_MAX_FPS
+        if self.strobe_reading is None:
+            offset, color = 0.0, "#555555"
+        else:
+            phase, beat, taken, in_tune = self.strobe_reading
+            phase += 2 * math.pi * beat * (time.perf_counter() - taken)
+            # Un ciclo de batido desplaza el dibujo una franja; en sentido horario si la cuerda está alta
+            offset = -(phase / (2 * math.pi)) * 360 / STROBE_SEGMENTS
+            color = "#00ff66" if in_tune else "#ffff00"
+
+        if (self.strobe_offset is not None and abs(offset - self.strobe_offset) < 0.5
+                and color == self.strobe_color):
+            return
+        self.strobe_offset = offset
+        self.strobe_color = color
+        for index, arc in enumerate(self.strobe_arcs):
+            self.tuner_canvas.itemconfig(arc, start=offset + index * 360 / STROBE_SEGMENTS, outline=color)
 
     def control_tuning(self):
         if self.is_tuning:
             self.is_tuning = False
+            self.scheduler.stop()
             self.start_button.configure(text="INICIAR", bg="#00d9ff")
-            self.status_label.config(text="Estado: Detenido", fg="#888888")
+            self.set_label(self.status_label, "Estado: Detenido", "#888888")
+        elif self.audio_stream is None:
+            self.open_audio()
         else:
-            self.is_tuning = True
-            self.start_button.configure(text="DETENER", bg="#ff9900")
-            self.tune_guitar()
-
-    def tune_guitar(self):
-        if not self.is_tuning:
+            self.start_tuning()
+
+    def start_tuning(self):
+        self.is_tuning = True
+        self.start_button.configure(text="DETENER", bg="#ff9900")
+        self.tuner_engine.reset()
+        self.waiting = True
+        self.scheduler.start()
+        self.refresh_display()
+        if self.metrics.enabled:
+            self.report_metrics()
+
+    def open_audio(self):
+        if self.audio_opener is not None:
+            return  # Ya se está abriendo
+        self.start_button.configure(text="ABRIENDO...", bg="#888888")
+        self.set_label(self.status_label, "Estado: Abriendo el micrófono...", "#888888")
+        self.audio_open_started = time.perf_counter()
+        self.audio_opener = threading.Thread(target=self.open_audio_stream, name="audio-open", daemon=True)
+        self.audio_opener.start()
+        self.wait_for_audio()
+
+    def open_audio_stream(self):
+        # Hilo en segundo plano: importar PyAudio, inicializarlo y abrir el dispositivo
+        try:
+            from audio_stream import AudioStream
+            self.audio_stream = AudioStream(FORMAT, CHANNELS, RATE, CHUNK, use_callback=True,
+                                            capture_path=CAPTURE_PATH)
+        except Exception as error:
+            self.audio_error = error
+
+    def wait_for_audio(self):
+        if self.audio_opener.is_alive():
+            self.root.after(50, self.wait_for_audio)
             return
-
-        data = self.audio_stream.read()
-        if data is None:
-            self.root.after(100, self.tune_guitar)
+        self.audio_opener = None
+        if self.audio_stream is None:
+            self.start_button.configure(text="INICIAR", bg="#00d9ff")
+            self.set_label(self.status_label, f"Estado: Error de audio ({self.audio_error})", "#ff3333")
             return
 
-        audio_data = np.frombuffer(data, dtype=np.int16)
-        if len(audio_data) != CHUNK:
-            self.root.after(100, self.tune_guitar)
-            return
+        self.set_label(self.status_label, "Estado: Esperando...", "#888888")
+        self.scheduler.stream = self.audio_stream
+        self.metrics.add_source(self.audio_stream.stats, self.audio_stream.STATS_GAUGES)
+        self.mark_startup("audio", since=self.audio_open_started)
+        self.start_tuning()
 
-        filtered_data = self.signal_processor.lowpass_filter(audio_data, 450.0)
-        windowed_data = filtered_data * np.hamming(len(filtered_data))
-        dominant_frequency, dominant_magnitude = self.signal_processor.dominant_freq(windowed_data)
+    def refresh_display(self):
+        if not self.is_tuning:
+            return
 
-        if self.auto_detect_mode:
-            detected_string = self.detect_string(dominant_frequency)
-
-            if detected_string:
-                self.detection_frames += 1
-
-                if self.detection_frames >= self.transition_threshold:
-                    self.auto_detect_mode = False
-                    self.detection_frames = 0
-                    self.select_string(detected_string)
-                else:
-                    self.current_string.set(detected_string)
-                    self.string_info_label.config(text=f"Cuerda: {detected_string} ({STRING_NAMES[detected_string]}) • Detectada")
+        # A ritmo fijo de pantalla: solo se dibuja el último resultado, por mucho que analice el otro hilo
+        result = self.scheduler.latest()
+        if result is not None:
+            self.on_tuner_result(result)
+        if self.tuner_engine.strobe_mode:
+            self.draw_strobe()
+        if self.visualizer is not None and WATERFALL_COLUMNS:
+            self.advance_waterfall()
+
+        self.root.after(1000 // DISPLAY_MAX_FPS, self.refresh_display)
+
+    def advance_waterfall(self):
+        # Una columna por refresco, también en silencio: el eje de la cascada es tiempo, no lecturas
+        try:
+            self.visualizer.advance_waterfall(self.waiting)
+        except Exception:
+            self.metrics.increment("visualizer_errors")
+
+    def on_tuner_result(self, result):
+        if result.strings is not None:
+            self.show_strum(result.strings)
+            if result.status != STATUS_WAITING:
+                self.set_label(self.string_info_label,
+                               f"Cuerda: {result.string} ({self.string_names[result.string]}) • Más fuerte")
+        elif self.auto_detect_mode:
+            if not result.auto_detect:
+                # El motor fijó la cuerda en cuanto la nota fue estable; la suelta en la siguiente pulsación
+                if self.locked_string != result.string:
+                    self.locked_string = result.string
+                    self.current_string.set(result.string)
+                    self.set_label(self.string_info_label,
+                                   f"Cuerda: {result.string} ({self.string_names[result.string]}) ✓ Fijada")
                     self.draw_guitar()
+            elif result.detected:
+                self.locked_string = None
+                self.current_string.set(result.string)
+                self.set_label(self.string_info_label, f"Cuerda: {result.string} ({self.string_names[result.string]}) • Detectada")
+                self.draw_guitar()
             else:
-                self.detection_frames = 0
-                self.current_string.set("E4")  # Mantener por defecto
-
-        filtered_frequency = dominant_frequency
-
-        if dominant_frequency is not None and dominant_frequency > 0:
-            for string_key, reference_freq in REFERENCE_FREQUENCIES.items():
-                ratio = dominant_frequency / reference_freq
+                self.locked_string = None
+                self.current_string.set(result.string)
+
+        if not hasattr(self, 'tuner_bar_left'):
+            canvas_width = self.tuner_canvas.winfo_width()
+            if canvas_width <= 1:
+                canvas_width = 300
+            self.tuner_bar_left = 2
+            self.tuner_bar_right = canvas_width - 2
+            self.tuner_bar_top = 50
+            self.tuner_bar_bottom = 80
+
+        bar_left = self.tuner_bar_left
+        bar_right = self.tuner_bar_right
+        bar_top = self.tuner_bar_top
+        bar_bottom = self.tuner_bar_bottom
 
-                for harmonic in [2, 2.5, 3, 3.5, 4]:
-                    if abs(ratio - harmonic) < 0.15:  # Tolerancia ±15%
-                        filtered_frequency = dominant_frequency / harmonic
-                        break
-
-        detection_freq = filtered_frequency if filtered_frequency is not None else dominant_frequency
+        bar_width = bar_right - bar_left
+        bar_center = bar_left + bar_width / 2
 
-        if self.auto_detect_mode:
-            detected_string = self.detect_string(detection_freq)
-
-            if detected_string:
-                self.detection_frames += 1
-
-                if self.detection_frames >= self.transition_threshold:
-                    self.auto_detect_mode = False
-                    self.detection_frames = 0
-                    self.select_string(detected_string)
-                else:
-                    self.current_string.set(detected_string)
-                    self.string_info_label.config(text=f"Cuerda: {detected_string} ({STRING_NAMES[detected_string]}) • Detectada")
-                    self.draw_guitar()
-            else:
-                self.detection_frames = 0
-                self.current_string.set("E4")  # Mantener por defecto
+        if result.strobe_phase is None:
+            self.strobe_reading = None
+        else:
+            beat = result.frequency - self.tuner_engine.references[result.string]
+            self.strobe_reading = (result.strobe_phase, beat, time.perf_counter(),
+                                   result.status == STATUS_IN_TUNE)
+
+        self.waiting = result.status == STATUS_WAITING
+        if self.waiting:
+            self.set_label(self.frequency_label, "Frecuencia: --- Hz")
+            self.set_label(self.status_label, "Estado: Esperando señal...", "#888888")
+            self.draw_tuner_needle(self.tuner_canvas, bar_center, bar_top, bar_bottom)
+            return
 
-        selected_string = self.current_string.get()
-        reference_freq = REFERENCE_FREQUENCIES[selected_string]
-
-        adjusted_frequency = dominant_frequency
-
-        if dominant_frequency is not None and dominant_frequency > 0:
-            ratio = dominant_frequency / reference_freq
-
-            if 1.8 < ratio < 2.2:
-                adjusted_frequency = dominant_frequency / 2
-            elif 1.4 < ratio < 1.6:
-                adjusted_frequency = dominant_frequency / 1.5
-            elif 2.8 < ratio < 3.2:
-                adjusted_frequency = dominant_frequency / 3
-
-        MAGNITUDE_THRESHOLD = max(50, int(reference_freq * 0.8))
-
-        if adjusted_frequency is not None and dominant_magnitude > MAGNITUDE_THRESHOLD:
-            if adjusted_frequency > 0:
-                cents_offset = 1200 * math.log2(adjusted_frequency / reference_freq)
-                self.current_frequency = adjusted_frequency
-                self.frequency_label.config(text=f"Frecuencia: {adjusted_frequency:.2f} Hz")
-                self.tuning_offset = cents_offset
-
-                try:
-                    self.visualizer.update(audio_data, dominant_frequency)
-                except Exception as e:
-                    pass
-
-                canvas_width = self.tuner_canvas.winfo_width()
-                canvas_height = self.tuner_canvas.winfo_height()
-                if canvas_width <= 1:
-                    canvas_width = 300
-                if canvas_height <= 1:
-                    canvas_height = 220
-
-                if not hasattr(self, 'tuner_bar_left'):
-                    self.tuner_bar_left = 2
-                    self.tuner_bar_right = canvas_width - 2
-                    self.tuner_bar_top = 50
-                    self.tuner_bar_bottom = 80
-
-                bar_left = self.tuner_bar_left
-                bar_right = self.tuner_bar_right
-                bar_top = self.tuner_bar_top
-                bar_bottom = self.tuner_bar_bottom
-
-                bar_width = bar_right - bar_left
-                bar_center = bar_left + bar_width / 2
-
-                # Mapear offset en cents a posición en la barra
-                max_cents_display = 50
-                normalized_offset = max(-1, min(1, cents_offset / max_cents_display))
-                needle_x = bar_center + (normalized_offset * bar_width / 2)
-
-                needle_x = max(bar_left + 5, min(bar_right - 5, needle_x))
-
-                self.draw_tuner_needle(self.tuner_canvas, needle_x, bar_top, bar_bottom)
-
-                if abs(cents_offset) <= 25:  # ±25 cents de tolerancia
-                    self.tuning_status = "AFINADO ✓"
-                    self.status_label.config(text=f"Estado: {self.tuning_status} ({cents_offset:+.1f}¢)", fg="#00ff66")
-                elif cents_offset > 25:
-                    self.tuning_status = "DEMASIADO ALTA"
-                    self.status_label.config(text=f"Estado: {self.tuning_status} (+{cents_offset:.1f}¢)", fg="#ff3333")
-                else:
-                    self.tuning_status = "DEMASIADO BAJA"
-                    self.status_label.config(text=f"Estado: {self.tuning_status} ({cents_offset:.1f}¢)", fg="#ff3333")
+        cents_offset = result.cents
+        self.current_frequency = result.frequency
+        # Con el estroboscopio la lectura tiene una décima de cent de precisión
+        precision = 2 if result.strobe_phase is None else 3
+        self.set_label(self.frequency_label, f"Frecuencia: {result.frequency:.{precision}f} Hz")
+        self.tuning_offset = cents_offset
+
+        if self.visualizer is not None:
+            try:
+                # Las últimas muestras se copian directamente al buffer del visualizador
+                audio_data = self.audio_stream.read_latest(CHUNK, self.visualizer.audio_buffer)
+                # El espectro es un buffer del motor: se copia sin que el hilo de análisis lo reescriba
+                with self.scheduler.lock:
+                    self.visualizer.update(audio_data, result.peak_frequency, self.tuner_engine.spectrum)
+            except Exception:
+                self.metrics.increment("visualizer_errors")
+
+        # Mapear offset en cents a posición en la barra
+        max_cents_display = 50
+        normalized_offset = max(-1, min(1, cents_offset / max_cents_display))
+        needle_x = bar_center + (normalized_offset * bar_width / 2)
+
+        needle_x = max(bar_left + 5, min(bar_right - 5, needle_x))
+
+        self.draw_tuner_needle(self.tuner_canvas, needle_x, bar_top, bar_bottom)
+
+        if result.status == STATUS_IN_TUNE:
+            self.tuning_status = "AFINADO ✓"
+            color = "#00ff66"
+        elif result.status == STATUS_SHARP:
+            self.tuning_status = "DEMASIADO ALTA"
+            color = "#ff3333"
+        else:
+            self.tuning_status = "DEMASIADO BAJA"
+            color = "#ff3333"
+        precision = 1 if result.strobe_phase is None else 2
+        self.set_label(self.status_label, f"Estado: {self.tuning_status} ({cents_offset:+.{precision}f}¢)", color)
+
+    def set_label(self, label, text, fg=None):
+        # Reconfigurar un Label con el mismo texto también cuesta tiempo de Tk
+        state = (text, fg)
+        if self.label_state.get(label) == state:
+            return
+        self.label_state[label] = state
+        if fg is None:
+            label.config(text=text)
         else:
-            self.frequency_label.config(text="Frecuencia: --- Hz")
-            self.status_label.config(text="Estado: Esperando señal...", fg="#888888")
+            label.config(text=text, fg=fg)
 
-            if not hasattr(self, 'tuner_bar_left'):
-                canvas_width = self.tuner_canvas.winfo_width()
-                if canvas_width <= 1:
-                    canvas_width = 300
-                self.tuner_bar_left = 2
-                self.tuner_bar_right = canvas_width - 2
-                self.tuner_bar_top = 50
-                self.tuner_bar_bottom = 80
+    def report_metrics(self):
+        if not self.is_tuning:
+            return
 
-            bar_center = self.tuner_bar_left + (self.tuner_bar_right - self.tuner_bar_left) / 2
-            self.draw_tuner_needle(self.tuner_canvas, bar_center, self.tuner_bar_top, self.tuner_bar_bottom)
+        summary = self.metrics.format_overlay()
+        if hasattr(self, 'metrics_label'):
+            self.set_label(self.metrics_label, summary)
+        if METRICS_STDOUT:
+            print(summary)
 
-        self.root.after(100, self.tune_guitar)
+        self.root.after(METRICS_INTERVAL_MS, self.report_metrics)
 
     def close(self):
-        self.audio_stream.close()
+        self.scheduler.stop()
+        if self.audio_opener is not None:
+            # Un dispositivo a medio abrir también hay que cerrarlo
+            self.audio_opener.join()
+        if self.audio_stream is not None:
+            self.audio_stream.close()
+        if self.metrics.enabled and METRICS_DUMP_PATH:
+            self.metrics.dump(METRICS_DUMP_PATH)
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = GuitarTunerGUI(root)
+    app = GuitarTunerGUI(root, started=STARTED)
     try:
         root.mainloop()
     finally:
@@ -1,11 +1,14 @@
+import time
+
+STARTED = time.perf_counter()  # Antes de importar la GUI: el arranque medido incluye los imports
+
 from guitar_tuner_gui import GuitarTunerGUI
 import tkinter as tk
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = GuitarTunerGUI(root)
+    app = GuitarTunerGUI(root, started=STARTED)
     try:
         root.mainloop()
     finally:
         app.close()
-
@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+
+class _NullStage:
+    # Contexto compartido cuando las métricas están desactivadas: no mide nada
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    # Una medida: el instante de inicio es de este uso, no del timer compartido. Así una etapa se puede
+    # medir a la vez desde el hilo de análisis y el de Tk, o anidada dentro de sí misma
+    __slots__ = ("timer", "start_ns")
+
+    def __init__(self, timer):
+        self.timer = timer
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.record(time.perf_counter_ns() - self.start_ns)
+        return False
+
+
+class StageTimer:
+    def __init__(self, name, window=256):
+        self.name = name
+        # Histograma móvil: las últimas `window` duraciones en un buffer circular
+        self.samples = np.zeros(window, dtype=np.int64)
+        self.index = 0
+        self.count = 0
+        self.total_ns = 0
+        self.lock = threading.Lock()
+
+    def record(self, duration_ns):
+        with self.lock:
+            self.samples[self.index] = duration_ns
+            self.index = (self.index + 1) % len(self.samples)
+            self.count += 1
+            self.total_ns += duration_ns
+
+    def summary(self):
+        recent = self.samples[:min(self.count, len(self.samples))] / 1e6
+        if len(recent) == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": float(np.mean(recent)),
+            "p50_ms": float(np.percentile(recent, 50)),
+            "p99_ms": float(np.percentile(recent, 99)),
+            "max_ms": float(np.max(recent)),
+            "total_s": self.total_ns / 1e9,
+        }
+
+
+class Metrics:
+    def __init__(self, enabled=False, window=256):
+        self.enabled = enabled
+        self.window = window
+        self.timers = {}
+        self.counters = {}
+        self.sources = []
+
+    def timer(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers.setdefault(name, StageTimer(name, self.window))
+        return timer
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self.timer(name))
+
+    def observe(self, name, seconds):
+        # Duración medida fuera del reloj (por ejemplo en tiempo de audio): mismo histograma que una etapa
+        if self.enabled:
+            self.timer(name).record(int(seconds * 1e9))
+
+    def increment(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_source(self, source, gauges=()):
+        # Función que devuelve un dict de valores externos (por ejemplo AudioStream.stats). `gauges` nombra
+        # los que son instantáneos (buffered_samples, clientes conectados...); el resto son contadores crecientes
+        self.sources.append((source, frozenset(gauges)))
+
+    def snapshot(self):
+        # Copias: el hilo de análisis puede crear etapas o contadores mientras se exporta
+        counters = dict(self.counters)
+        gauges = {}
+        for source, gauge_names in self.sources:
+            for name, value in source().items():
+                if name in gauge_names:
+                    gauges[name] = value
+                else:
+                    counters[name] = value
+        return {
+            "timestamp": time.time(),
+            "stages": {name: timer.summary() for name, timer in list(self.timers.items())},
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="guitar_tuner"):
+        snapshot = self.snapshot()
+        lines = []
+        metric = f"{prefix}_stage_seconds"
+        if any(summary["count"] for summary in snapshot["stages"].values()):
+            lines.append(f"# TYPE {metric} summary")
+        for name, summary in snapshot["stages"].items():
+            if summary["count"] == 0:
+                continue
+            for quantile, key in (("0.5", "p50_ms"), ("0.99", "p99_ms")):
+                lines.append(f'{metric}{{stage="{name}",quantile="{quantile}"}} {summary[key] / 1000:.9f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {summary["total_s"]:.9f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {summary["count"]}')
+        # Solo los contadores crecientes llevan _total; los valores instantáneos se exportan como gauge
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in snapshot["gauges"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def format_overlay(self):
+        snapshot = self.snapshot()
+        parts = []
+        for name, summary in snapshot["stages"].items():
+            if summary["count"] > 0:
+                parts.append(f"{name} {summary['p50_ms']:.2f}/{summary['p99_ms']:.2f} ms")
+        for name, value in {**snapshot["counters"], **snapshot["gauges"]}.items():
+            parts.append(f"{name}={value}")
+        return "  ".join(parts)
+
+    def dump(self, path):
+        with open(path, "w") as output:
+            if path.endswith(".prom"):
+                output.write(self.to_prometheus())
+            else:
+                output.write(self.to_json())
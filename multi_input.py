@@ -0,0 +1,183 @@
+import math
+import threading
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from analysis_scheduler import LatestSlot
+from metrics import Metrics
+from note_table import A4_FREQUENCY, NoteTable
+from pitch_estimator import create_estimator
+from signal_processor import AnalysisPlan, SlidingWindow, StreamingLowpass
+from tuner_engine import STATUS_WAITING, TunerResult, tuning_status
+
+# Una entrada del banco: un canal de un stream (AudioStream o ReplayStream)
+StationInput = namedtuple("StationInput", ["name", "stream", "channel"])
+
+
+class ChannelBank:
+    # Todas las entradas a la misma frecuencia de muestreo: filtro, ventana, FFT y estimador en lote
+    def __init__(self, rate, inputs, chunk=4096, hop_size=512, estimator="yin", pitch_window=2048,
+                 min_confidence=0.8, cutoff=450.0, tuning="standard", a4=A4_FREQUENCY):
+        self.rate = rate
+        self.inputs = inputs
+        self.hop_size = hop_size
+        self.pitch_window = pitch_window
+        self.min_confidence = min_confidence
+        channels = len(inputs)
+
+        self.note_table = NoteTable.from_tuning(tuning, a4)
+        references = self.note_table.references
+        self.min_freq = min(70.0, 0.85 * min(references.values()))
+        self.max_freq = max(350.0, 1.06 * max(references.values()))
+
+        self.lowpass = StreamingLowpass(rate, cutoff, channels=channels)
+        self.sliding_window = SlidingWindow(chunk, hop_size, channels=channels)
+        self.plan = AnalysisPlan(rate, chunk, self.min_freq, self.max_freq)
+        self.pitch_estimator = create_estimator(estimator, rate, min_freq=self.min_freq, max_freq=self.max_freq)
+
+        # Cada stream se lee una vez por salto, con todos sus canales; luego se eligen las filas del banco
+        self.streams = []
+        for stream in dict.fromkeys(entry.stream for entry in inputs):
+            rows = [row for row, entry in enumerate(inputs) if entry.stream is stream]
+            picks = [inputs[row].channel for row in rows]
+            block = np.empty((stream.channels, hop_size), dtype=np.int16)
+            self.streams.append((stream, rows, picks, block))
+        self.hop = np.empty((channels, hop_size), dtype=np.int16)
+
+    def reset(self):
+        self.lowpass.reset()
+        self.sliding_window.reset()
+
+    def ready(self):
+        # Un salto completo en todos los streams: un dispositivo que se retrasa no desalinea a los demás
+        return all(stream.available() >= self.hop_size for stream, _, _, _ in self.streams)
+
+    def step(self):
+        # Consume los saltos disponibles y analiza solo la ventana más reciente
+        windows_ready = 0
+        while self.ready():
+            for stream, rows, picks, block in self.streams:
+                stream.read_channels(block)
+                self.hop[rows] = block[picks]
+            if self.sliding_window.push(self.lowpass.process(self.hop)):
+                windows_ready += 1
+        if not windows_ready:
+            return None
+        return self.analyze(self.sliding_window.window())
+
+    def magnitude_threshold(self, reference_freq):
+        # Mismo umbral que TunerEngine sin puerta de ruido
+        return max(50, int(reference_freq * 0.8))
+
+    def analyze(self, window):
+        # Una FFT 2-D y una llamada al estimador para todos los canales
+        magnitude = self.plan.analyze_batch(window)
+        peak_frequencies, peak_magnitudes = self.plan.peaks(magnitude)
+        pitches, confidences = self.pitch_estimator.estimate_frames(window[:, -self.pitch_window:])
+
+        results = []
+        for row in range(len(self.inputs)):
+            peak_frequency = float(peak_frequencies[row])
+            peak_magnitude = float(peak_magnitudes[row])
+            confidence = float(confidences[row])
+            if math.isfinite(pitches[row]) and confidence >= self.min_confidence:
+                frequency = float(pitches[row])
+            else:
+                frequency = self.note_table.harmonic_correction(peak_frequency)
+
+            string_key, cents = self.note_table.nearest(frequency)
+            if string_key is None or peak_magnitude <= self.magnitude_threshold(self.note_table.references[string_key]):
+                results.append(TunerResult(None, string_key, None, STATUS_WAITING, confidence, peak_frequency,
+                                           peak_magnitude, True, False))
+            else:
+                results.append(TunerResult(frequency, string_key, cents, tuning_status(cents), confidence,
+                                           peak_frequency, peak_magnitude, True, True))
+        return results
+
+
+class MultiInputStation:
+    def __init__(self, inputs, chunk=4096, hop_size=512, estimator="yin", wait_timeout=0.05, metrics=None,
+                 **bank_options):
+        self.inputs = inputs
+        self.wait_timeout = wait_timeout
+        self.metrics = metrics if metrics is not None else Metrics()
+
+        # Un banco por frecuencia de muestreo; los canales de un mismo banco se analizan juntos
+        by_rate = {}
+        for entry in inputs:
+            by_rate.setdefault(entry.stream.rate, []).append(entry)
+        self.banks = [ChannelBank(rate, entries, chunk, hop_size, estimator, **bank_options)
+                      for rate, entries in by_rate.items()]
+        # Con dispositivos a distintas frecuencias, cada banco en un hilo del pool
+        self.executor = ThreadPoolExecutor(len(self.banks)) if len(self.banks) > 1 else None
+
+        self.slots = {entry.name: LatestSlot() for entry in inputs}
+        self.errors = 0
+        self.last_error = None
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def reset(self):
+        for bank in self.banks:
+            bank.reset()
+
+    def step(self):
+        with self.metrics.stage("station"):
+            if self.executor is None:
+                batches = [self.banks[0].step()]
+            else:
+                batches = list(self.executor.map(ChannelBank.step, self.banks))
+
+        updated = 0
+        for bank, results in zip(self.banks, batches):
+            if results is None:
+                continue
+            for entry, result in zip(bank.inputs, results):
+                self.slots[entry.name].put(result)
+                updated += 1
+        if not updated:
+            self.metrics.increment("empty_polls")
+        return updated
+
+    def run(self):
+        # Despierta con el audio del primer stream; los demás dispositivos ya tienen sus bloques en el anillo
+        stream = self.inputs[0].stream
+        while not self.stopping.is_set():
+            stream.wait(self.wait_timeout)
+            try:
+                self.step()
+            except Exception as error:
+                # Como en AnalysisScheduler.run: un frame defectuoso no congela todas las lecturas
+                self.errors += 1
+                self.last_error = error
+                self.metrics.increment("analysis_errors")
+                if self.errors == 1:
+                    traceback.print_exc()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name="station", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def latest(self, name):
+        result, _ = self.slots[name].take()
+        return result
+
+    def close(self):
+        self.stop()
+        if self.executor is not None:
+            self.executor.shutdown()
+        for stream in dict.fromkeys(entry.stream for entry in self.inputs):
+            stream.close()
@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+
+
+class NoiseGate:
+    def __init__(self, rate, open_ratio=4.0, close_ratio=2.0, onset_ratio=2.0, min_level=20.0,
+                 hold_seconds=0.3, max_open_seconds=10.0, floor_fall=0.3, floor_rise=0.02):
+        self.rate = rate
+        # Umbrales relativos al suelo de ruido (4 ≈ +12 dB para abrir, 2 ≈ +6 dB para cerrar)
+        self.open_ratio = open_ratio
+        self.close_ratio = close_ratio
+        self.onset_ratio = onset_ratio
+        self.min_level = min_level  # RMS mínimo absoluto en unidades int16
+        self.hold_samples = int(hold_seconds * rate)
+        self.max_open_samples = int(max_open_seconds * rate)
+        # El suelo baja rápido y sube despacio: un golpe aislado apenas lo mueve
+        self.floor_fall = floor_fall
+        self.floor_rise = floor_rise
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.floor = None
+        self.previous_rms = 0.0
+        self.rms = 0.0
+        self.peak = 0
+        self.is_open = False
+        self.onset = False
+        self.hold = 0
+        self.open_samples = 0
+
+    def measure(self, samples):
+        # RMS y pico sobre el int16 crudo, sin filtro ni ventana
+        if len(self.buffer) != len(samples):
+            self.buffer = np.empty(len(samples), dtype=np.float32)
+        np.copyto(self.buffer, samples, casting='unsafe')
+        self.rms = math.sqrt(float(np.dot(self.buffer, self.buffer)) / len(samples))
+        self.peak = max(int(samples.max()), -int(samples.min()))
+        return self.rms
+
+    def process(self, samples):
+        if len(samples) == 0:
+            self.onset = False
+            return self.is_open
+
+        rms = self.measure(samples)
+        if self.floor is None:
+            # El primer salto fija el suelo: lo que ya sonaba al arrancar no cuenta como pulsación
+            self.floor = max(rms, 1.0)
+
+        open_level = max(self.min_level, self.open_ratio * self.floor)
+        # Inicio de nota: el nivel salta respecto al salto anterior y supera el umbral de apertura
+        self.onset = rms >= open_level and rms >= self.onset_ratio * self.previous_rms
+        self.previous_rms = rms
+
+        if self.onset:
+            self.is_open = True
+            self.hold = self.hold_samples
+            self.open_samples = 0
+        elif self.is_open:
+            self.open_samples += len(samples)
+            if rms >= max(self.min_level, self.close_ratio * self.floor):
+                self.hold = self.hold_samples
+            else:
+                self.hold -= len(samples)
+            # Un ruido que sube y se queda no mantiene la puerta abierta para siempre
+            if self.hold <= 0 or self.open_samples >= self.max_open_samples:
+                self.is_open = False
+
+        if not self.is_open:
+            # Solo se aprende el suelo con la puerta cerrada: la nota no es ruido
+            rate = self.floor_fall if rms < self.floor else self.floor_rise
+            self.floor += rate * (rms - self.floor)
+            self.floor = max(self.floor, 1.0)
+
+        return self.is_open
+
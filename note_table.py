@@ -0,0 +1,142 @@
+import math
+import re
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+A4_FREQUENCY = 440.0
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+FLATS = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+
+# Afinaciones de la cuerda más aguda a la más grave, como en la GUI
+TUNINGS = {
+    "standard": ["E4", "B3", "G3", "D3", "A2", "E2"],
+    "drop_d": ["E4", "B3", "G3", "D3", "A2", "D2"],
+    "dadgad": ["D4", "A3", "G3", "D3", "A2", "D2"],
+    "open_g": ["D4", "B3", "G3", "D3", "G2", "D2"],
+    "seven_string": ["E4", "B3", "G3", "D3", "A2", "E2", "B1"],
+    "bass": ["G2", "D2", "A1", "E1"],
+    "bass_five": ["G2", "D2", "A1", "E1", "B0"],
+}
+
+HARMONICS = [2, 2.5, 3, 3.5, 4]
+HARMONIC_TOLERANCE = 0.15  # Tolerancia sobre la razón f / referencia (±15%)
+MAX_DETECTION_CENTS = 150
+
+_NOTE_PATTERN = re.compile(r"^([A-G][#b]?)(-?\d+)$")
+
+
+def note_midi(name):
+    match = _NOTE_PATTERN.match(name)
+    if match is None:
+        raise ValueError(f"Nota no válida: {name!r}")
+    pitch, octave = match.groups()
+    pitch = FLATS.get(pitch, pitch)
+    if pitch not in NOTE_NAMES:
+        raise ValueError(f"Nota no válida: {name!r}")
+    return NOTE_NAMES.index(pitch) + 12 * (int(octave) + 1)
+
+
+def note_frequency(name, a4=A4_FREQUENCY):
+    return a4 * 2.0 ** ((note_midi(name) - 69) / 12.0)
+
+
+def nearest_note(frequencies, a4=A4_FREQUENCY):
+    # Nota cromática más cercana (para análisis offline), vectorizado
+    semitones = 12 * np.log2(frequencies / a4)
+    nearest = np.round(semitones)
+    cents = 100 * (semitones - nearest)
+    midi = nearest.astype(int) + 69
+    names = [f"{NOTE_NAMES[m % 12]}{m // 12 - 1}" for m in midi]
+    return names, cents
+
+
+class NoteTable:
+    def __init__(self, strings, a4=A4_FREQUENCY, max_cents=MAX_DETECTION_CENTS, harmonics=HARMONICS,
+                 harmonic_tolerance=HARMONIC_TOLERANCE):
+        if isinstance(strings, dict):
+            references = dict(strings)
+        else:
+            references = {name: note_frequency(name, a4) for name in strings}
+            if len(references) != len(strings):
+                raise ValueError("La afinación repite una nota")
+
+        self.a4 = a4
+        self.max_cents = max_cents
+        self.references = references
+        self.keys = list(references)
+        self.frequencies = np.array([references[key] for key in self.keys])
+
+        # Índice ordenado en cents absolutos: la búsqueda es binaria (bisect o searchsorted)
+        cents = 1200 * np.log2(self.frequencies)
+        self.order = np.argsort(cents)
+        self.sorted_cents = cents[self.order]
+        # Fronteras a mitad de camino (en cents) entre notas consecutivas
+        self.boundaries = (self.sorted_cents[1:] + self.sorted_cents[:-1]) / 2
+        # Copias en listas de Python: para un solo valor bisect evita la sobrecarga de NumPy
+        self._boundaries = self.boundaries.tolist()
+        self._sorted_cents = self.sorted_cents.tolist()
+        self._sorted_keys = [self.keys[index] for index in self.order]
+
+        self._build_harmonic_index(harmonics, harmonic_tolerance)
+
+    def _build_harmonic_index(self, harmonics, tolerance):
+        # Cada cuerda × armónico define un intervalo (ref·(h-tol), ref·(h+tol)). Entre dos
+        # extremos consecutivos la corrección es constante, así que se precalcula por tramo
+        intervals = []
+        for reference in self.frequencies:
+            for harmonic in harmonics:
+                intervals.append((reference * (harmonic - tolerance), reference * (harmonic + tolerance),
+                                  float(harmonic)))
+
+        edges = sorted({edge for low, high, _ in intervals for edge in (low, high)})
+        divisors = [1.0]
+        for left, right in zip(edges[:-1], edges[1:]):
+            middle = (left + right) / 2
+            divisor = 1.0
+            # Mismo criterio que el bucle original: gana la última cuerda (la más grave) que coincide
+            for low, high, harmonic in intervals:
+                if low < middle < high:
+                    divisor = harmonic
+            divisors.append(divisor)
+        divisors.append(1.0)
+
+        self.harmonic_edges = edges
+        self.harmonic_divisors = divisors
+
+    @classmethod
+    def from_tuning(cls, tuning="standard", a4=A4_FREQUENCY, **kwargs):
+        if tuning not in TUNINGS:
+            raise ValueError(f"Afinación desconocida: {tuning!r}. Opciones: {', '.join(TUNINGS)}")
+        return cls(TUNINGS[tuning], a4, **kwargs)
+
+    def cents(self, frequency, string_key):
+        return 1200 * math.log2(frequency / self.references[string_key])
+
+    def nearest(self, frequency):
+        # Cuerda más cercana y desviación en cents, o (None, None) fuera de max_cents
+        if frequency is None or frequency <= 0:
+            return None, None
+        cents = 1200 * math.log2(frequency)
+        position = bisect_left(self._boundaries, cents)
+        offset = cents - self._sorted_cents[position]
+        if abs(offset) >= self.max_cents:
+            return None, None
+        return self._sorted_keys[position], offset
+
+    def nearest_many(self, frequencies):
+        # Versión vectorizada: índices de cuerda (-1 sin cuerda) y cents
+        frequencies = np.asarray(frequencies, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cents = 1200 * np.log2(frequencies)
+        positions = np.searchsorted(self.boundaries, cents)
+        offsets = cents - self.sorted_cents[positions]
+        indices = self.order[positions]
+        invalid = ~(np.abs(offsets) < self.max_cents)
+        indices = np.where(invalid, -1, indices)
+        offsets[invalid] = np.nan
+        return indices, offsets
+
+    def harmonic_correction(self, frequency):
+        # Si la frecuencia cae cerca de un armónico de alguna cuerda, devuelve la fundamental
+        return frequency / self.harmonic_divisors[bisect_right(self.harmonic_edges, frequency)]
@@ -0,0 +1,131 @@
+import argparse
+import base64
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+# Mismos puertos que pitch_server; el cliente no depende del resto del proyecto
+WS_PORT = 8765
+UDP_PORT = 8766
+RENEW_SECONDS = 5.0  # El servidor olvida a los clientes UDP que no renuevan en 10 s
+# Buffer de recepción pequeño: si el cliente se retrasa, el servidor descarta eventos en vez de
+# acumular segundos de lecturas viejas en el sistema operativo
+RECEIVE_BUFFER_BYTES = 4096
+
+
+def format_event(event):
+    # Edad = retraso desde que el servidor analizó la ventana (relojes de la misma máquina o sincronizados)
+    age_ms = (time.time() - event["t"]) * 1000
+    if event["hz"] is None:
+        return f"#{event['seq']:<6} {event['string']:<3} ---            {event['status']:<8} ({age_ms:.0f} ms)"
+    return (f"#{event['seq']:<6} {event['string']:<3} {event['hz']:8.2f} Hz {event['cents']:+7.2f}¢ "
+            f"{event['status']:<8} conf {event['conf']:.2f} ({age_ms:.0f} ms)")
+
+
+def listen_udp(host, port, count=None):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(1.0)
+    subscribed = 0.0
+    received = 0
+    try:
+        while count is None or received < count:
+            # La suscripción caduca: se renueva antes de que el servidor la olvide
+            if time.monotonic() - subscribed > RENEW_SECONDS:
+                sock.sendto(b"subscribe", (host, port))
+                subscribed = time.monotonic()
+            try:
+                data, _ = sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            received += 1
+            yield json.loads(data)
+    finally:
+        sock.sendto(b"unsubscribe", (host, port))
+        sock.close()
+
+
+def read_exactly(sock, count):
+    data = b""
+    while len(data) < count:
+        part = sock.recv(count - len(data))
+        if not part:
+            return None
+        data += part
+    return data
+
+
+def listen_websocket(host, port, count=None):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Debe fijarse antes de conectar para que la ventana TCP anunciada sea pequeña
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+    sock.connect((host, port))
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall((f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    response = b""
+    while b"\r\n\r\n" not in response:
+        part = sock.recv(1)
+        if not part:
+            break
+        response += part
+    if b" 101 " not in response.split(b"\r\n", 1)[0]:
+        raise ConnectionError(f"El servidor rechazó la conexión WebSocket: {response[:40]!r}")
+
+    received = 0
+    try:
+        while count is None or received < count:
+            # Lecturas sin buffer propio: no se adelantan eventos que luego llegarían viejos
+            header = read_exactly(sock, 2)
+            if header is None:
+                return
+            length = header[1] & 0x7F
+            if length == 126:
+                length, = struct.unpack("!H", read_exactly(sock, 2))
+            elif length == 127:
+                length, = struct.unpack("!Q", read_exactly(sock, 8))
+            payload = read_exactly(sock, length)
+            if payload is None:
+                return
+            if header[0] & 0x0F == 0x8:
+                return
+            received += 1
+            yield json.loads(payload)
+    finally:
+        # Trama de cierre con máscara (obligatoria del cliente al servidor)
+        try:
+            sock.sendall(struct.pack("!BB", 0x88, 0x80) + os.urandom(4))
+        except OSError:
+            pass
+        sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cliente de referencia del servidor de afinación")
+    parser.add_argument("protocol", choices=["ws", "udp"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--count", type=int, default=None, help="Salir tras N eventos")
+    args = parser.parse_args(argv)
+
+    if args.protocol == "udp":
+        events = listen_udp(args.host, args.port or UDP_PORT, args.count)
+    else:
+        events = listen_websocket(args.host, args.port or WS_PORT, args.count)
+
+    last_sequence = None
+    try:
+        for event in events:
+            if last_sequence is not None and event["seq"] > last_sequence + 1:
+                print(f"  ({event['seq'] - last_sequence - 1} eventos descartados)")
+            last_sequence = event["seq"]
+            print(format_event(event))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+import numpy as np
+
+from signal_processor import SignalProcessor
+
+
+class PitchEstimator:
+    def __init__(self, rate, min_freq=70.0, max_freq=350.0):
+        self.rate = rate
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+
+    def estimate(self, data):
+        # Devuelve (frecuencia, confianza) con confianza entre 0 y 1, o (None, 0.0)
+        raise NotImplementedError
+
+    def estimate_frames(self, frames):
+        # Versión por lotes: una fila por frame; NaN donde no hay estimación
+        frequencies = np.full(len(frames), np.nan)
+        confidences = np.zeros(len(frames))
+        for index, frame in enumerate(frames):
+            frequency, confidence = self.estimate(frame)
+            if frequency is not None:
+                frequencies[index] = frequency
+                confidences[index] = confidence
+        return frequencies, confidences
+
+
+class FFTPeakEstimator(PitchEstimator):
+    def __init__(self, rate, min_freq=70.0, max_freq=350.0):
+        super().__init__(rate, min_freq, max_freq)
+        self.signal_processor = SignalProcessor(rate)
+
+    def estimate(self, data):
+        plan = self.signal_processor.analysis_plan(len(data), self.min_freq, self.max_freq)
+        magnitude = plan.analyze(data)
+        frequency, peak_magnitude = plan.peak()
+        if frequency is None or peak_magnitude <= 0:
+            return None, 0.0
+        # Fracción de la energía del espectro concentrada en el pico
+        confidence = peak_magnitude ** 2 / np.dot(magnitude, magnitude)
+        return frequency, float(min(1.0, confidence))
+
+    def estimate_frames(self, frames):
+        plan = self.signal_processor.analysis_plan(frames.shape[-1], self.min_freq, self.max_freq)
+        power = np.abs(np.fft.rfft(frames * plan.window, axis=-1)) ** 2
+        band = power[:, plan.band_start:plan.band_stop]
+        peaks = np.argmax(band, axis=-1)
+        rows = np.arange(len(frames))
+        peak_power = band[rows, peaks]
+        total = np.sum(power, axis=-1)
+        confidences = np.zeros(len(frames))
+        np.divide(peak_power, total, out=confidences, where=total > 0)
+        # Como estimate(): sin energía en la banda (p. ej. silencio digital) no hay estimación
+        frequencies = np.where(peak_power > 0, plan.frequencies[plan.band_start + peaks], np.nan)
+        return frequencies, confidences
+
+
+def _parabolic_offset(left, center, right):
+    denominator = left - 2 * center + right
+    if denominator == 0:
+        return 0.0
+    return 0.5 * (left - right) / denominator
+
+
+def _fft_size(length):
+    return 1 << int(np.ceil(np.log2(length)))
+
+
+def _rfft(data, out):
+    # numpy >= 2.0 acepta out= en rfft/irfft; en versiones anteriores se copia
+    try:
+        return np.fft.rfft(data, out=out)
+    except TypeError:
+        out[:] = np.fft.rfft(data)
+        return out
+
+
+def _irfft(spectrum, size, out):
+    try:
+        return np.fft.irfft(spectrum, size, out=out)
+    except TypeError:
+        out[:] = np.fft.irfft(spectrum, size)
+        return out
+
+
+class YinPlan:
+    # Buffers de una ventana de tamaño fijo: ninguna asignación por frame. Con rows, cada buffer lleva una
+    # fila por frame y el mismo cálculo sirve para estimate_frames (lote) y para estimate (rows=None)
+    def __init__(self, length, min_lag, max_lag, rows=None):
+        self.length = length
+        self.min_lag = min_lag
+        self.max_lag = max_lag
+        self.rows = rows
+        self.window = length - max_lag
+        self.size = _fft_size(length + self.window)
+        lead = () if rows is None else (rows,)
+
+        # La señal y su primer tramo, ya rellenos con ceros hasta el tamaño de la FFT
+        self.padded = np.zeros(lead + (self.size,))
+        self.head = np.zeros(lead + (self.size,))
+        self.squares = np.empty(lead + (length,))
+        self.energy = np.zeros(lead + (length + 1,))
+        self.spectrum = np.empty(lead + (self.size // 2 + 1,), dtype=np.complex128)
+        self.head_spectrum = np.empty(lead + (self.size // 2 + 1,), dtype=np.complex128)
+        self.cross = np.empty(lead + (self.size,))
+
+        self.difference = np.empty(lead + (max_lag + 1,))
+        self.lags = np.arange(1, max_lag + 1, dtype=np.float64)
+        self.running = np.empty(lead + (max_lag,))
+        self.weighted = np.empty(lead + (max_lag,))
+        self.positive = np.empty(lead + (max_lag,), dtype=bool)
+        self.cmnd = np.ones(lead + (max_lag + 1,))
+
+        search = max_lag - min_lag
+        self.rising = np.ones(lead + (search,), dtype=bool)
+        self.candidates = np.empty(lead + (search,), dtype=bool)
+
+    def compute(self, data):
+        x = self.padded[..., :self.length]
+        np.copyto(x, data, casting='unsafe')
+        x -= x.mean(axis=-1, keepdims=True)
+        window = self.window
+        max_lag = self.max_lag
+
+        # d(tau) = sum (x_j - x_j+tau)^2 = energía(0) + energía(tau) - 2 * correlación(tau)
+        np.multiply(x, x, out=self.squares)
+        np.cumsum(self.squares, axis=-1, out=self.energy[..., 1:])
+        self.head[..., :window] = x[..., :window]
+        _rfft(self.padded, self.spectrum)
+        _rfft(self.head, self.head_spectrum)
+        np.conjugate(self.head_spectrum, out=self.head_spectrum)
+        self.spectrum *= self.head_spectrum
+        _irfft(self.spectrum, self.size, self.cross)
+
+        difference = self.difference
+        cross = self.cross[..., :max_lag + 1]
+        np.subtract(self.energy[..., window:window + max_lag + 1], self.energy[..., :max_lag + 1], out=difference)
+        difference += self.energy[..., window:window + 1]
+        cross *= 2
+        difference -= cross
+
+        # Normalización por media acumulada: d'(tau) = d(tau) * tau / sum d(1..tau)
+        np.cumsum(difference[..., 1:], axis=-1, out=self.running)
+        np.multiply(difference[..., 1:], self.lags, out=self.weighted)
+        np.greater(self.running, 0, out=self.positive)
+        self.cmnd[..., 1:] = 1.0
+        np.divide(self.weighted, self.running, out=self.cmnd[..., 1:], where=self.positive)
+        return self.cmnd
+
+    def first_dip(self, threshold):
+        # Primer valle por debajo del umbral: el primer punto bajo el umbral cuyo siguiente valor ya no
+        # desciende; si no hay ninguno, el mínimo global. Con rows, un retardo por fila
+        search = self.cmnd[..., self.min_lag:self.max_lag]
+        np.greater_equal(search[..., 1:], search[..., :-1], out=self.rising[..., :-1])
+        np.less(search, threshold, out=self.candidates)
+        self.candidates &= self.rising
+        if self.rows is None:
+            if self.candidates.any():
+                return self.min_lag + int(np.argmax(self.candidates))
+            return self.min_lag + int(np.argmin(search))
+        has_candidate = self.candidates.any(axis=-1)
+        tau = np.where(has_candidate, np.argmax(self.candidates, axis=-1), np.argmin(search, axis=-1))
+        return tau + self.min_lag
+
+
+class YinEstimator(PitchEstimator):
+    def __init__(self, rate, min_freq=70.0, max_freq=350.0, threshold=0.15):
+        super().__init__(rate, min_freq, max_freq)
+        self.threshold = threshold
+        self.min_lag = max(2, int(rate / max_freq))
+        self.max_lag = int(np.ceil(rate / min_freq)) + 1
+        self.plans = {}
+        # Un solo plan por lotes: con canales fijos se reutiliza; un lote de otro tamaño lo sustituye
+        self.batch_plan = None
+
+    def estimate_frames(self, frames):
+        frames = np.atleast_2d(frames)
+        if frames.shape[-1] <= 2 * self.max_lag:
+            return np.full(len(frames), np.nan), np.zeros(len(frames))
+
+        plan = self.batch_plan
+        if plan is None or plan.rows != len(frames) or plan.length != frames.shape[-1]:
+            # Soltar el plan anterior antes de reservar el nuevo: no conviven dos lotes en memoria
+            plan = self.batch_plan = None
+            plan = self.batch_plan = YinPlan(frames.shape[-1], self.min_lag, self.max_lag, rows=len(frames))
+        cmnd = plan.compute(frames)
+        tau = plan.first_dip(self.threshold)
+
+        rows = np.arange(len(frames))
+        left = cmnd[rows, tau - 1]
+        center = cmnd[rows, tau]
+        right = cmnd[rows, tau + 1]
+        denominator = left - 2 * center + right
+        offset = np.zeros(len(frames))
+        np.divide(0.5 * (left - right), denominator, out=offset, where=denominator != 0)
+
+        confidences = np.clip(1.0 - center, 0.0, 1.0)
+        return self.rate / (tau + offset), confidences
+
+    def estimate(self, data):
+        if len(data) <= 2 * self.max_lag:
+            return None, 0.0
+        plan = self.plans.get(len(data))
+        if plan is None:
+            plan = self.plans[len(data)] = YinPlan(len(data), self.min_lag, self.max_lag)
+
+        cmnd = plan.compute(data)
+        tau = plan.first_dip(self.threshold)
+        offset = _parabolic_offset(cmnd[tau - 1], cmnd[tau], cmnd[tau + 1])
+        confidence = min(1.0, max(0.0, 1.0 - float(cmnd[tau])))
+        return float(self.rate / (tau + offset)), confidence
+
+
+class McLeodPlan:
+    # Buffers de una ventana de tamaño fijo para McLeodEstimator; con rows, una fila por frame (como YinPlan)
+    def __init__(self, length, min_lag, max_lag, rows=None):
+        self.length = length
+        self.min_lag = min_lag
+        self.max_lag = max_lag
+        self.rows = rows
+        self.size = _fft_size(2 * length)
+        lead = () if rows is None else (rows,)
+
+        self.padded = np.zeros(lead + (self.size,))
+        self.squares = np.empty(lead + (length,))
+        self.energy = np.zeros(lead + (length + 1,))
+        self.spectrum = np.empty(lead + (self.size // 2 + 1,), dtype=np.complex128)
+        self.conjugate = np.empty(lead + (self.size // 2 + 1,), dtype=np.complex128)
+        self.autocorrelation = np.empty(lead + (self.size,))
+        self.normalization = np.empty(lead + (max_lag + 2,))
+        self.positive = np.empty(lead + (max_lag + 2,), dtype=bool)
+        self.nsdf = np.zeros(lead + (max_lag + 2,))
+
+        count = max_lag - min_lag + 1
+        self.peaks = np.empty(lead + (count,), dtype=bool)
+        self.condition = np.empty(lead + (count,), dtype=bool)
+        self.scores = np.empty(lead + (count,))
+
+    def compute(self, data):
+        n = self.length
+        lag_count = self.max_lag + 2
+        x = self.padded[..., :n]
+        np.copyto(x, data, casting='unsafe')
+        x -= x.mean(axis=-1, keepdims=True)
+
+        _rfft(self.padded, self.spectrum)
+        np.conjugate(self.spectrum, out=self.conjugate)
+        self.spectrum *= self.conjugate
+        _irfft(self.spectrum, self.size, self.autocorrelation)
+
+        # energy[n - lag] + energy[n] - energy[lag]: el primer término es un corte invertido
+        np.multiply(x, x, out=self.squares)
+        np.cumsum(self.squares, axis=-1, out=self.energy[..., 1:])
+        np.add(self.energy[..., n - lag_count + 1:n + 1][..., ::-1], self.energy[..., n:n + 1],
+               out=self.normalization)
+        self.normalization -= self.energy[..., :lag_count]
+
+        np.greater(self.normalization, 0, out=self.positive)
+        self.nsdf.fill(0.0)
+        np.divide(self.autocorrelation[..., :lag_count], self.normalization, out=self.nsdf, where=self.positive)
+        self.nsdf *= 2
+        return self.nsdf
+
+    def key_maximum(self, cutoff):
+        # Primer máximo local positivo que llega a cutoff × el mayor de ellos, o None. Con rows devuelve
+        # (retardos, filas con máximo); el retardo de una fila sin máximos no tiene sentido
+        nsdf = self.nsdf
+        center = nsdf[..., self.min_lag:self.max_lag + 1]
+        np.greater(center, nsdf[..., self.min_lag - 1:self.max_lag], out=self.peaks)
+        np.greater_equal(center, nsdf[..., self.min_lag + 1:self.max_lag + 2], out=self.condition)
+        self.peaks &= self.condition
+        np.greater(center, 0, out=self.condition)
+        self.peaks &= self.condition
+
+        self.scores.fill(-np.inf)
+        np.copyto(self.scores, center, where=self.peaks)
+        if self.rows is None:
+            if not self.peaks.any():
+                return None
+            np.greater_equal(self.scores, cutoff * self.scores.max(), out=self.condition)
+            return self.min_lag + int(np.argmax(self.condition))
+        found = self.peaks.any(axis=-1)
+        np.greater_equal(self.scores, cutoff * self.scores.max(axis=-1, keepdims=True), out=self.condition)
+        return self.min_lag + np.argmax(self.condition, axis=-1), found
+
+
+class McLeodEstimator(PitchEstimator):
+    def __init__(self, rate, min_freq=70.0, max_freq=350.0, cutoff=0.9):
+        super().__init__(rate, min_freq, max_freq)
+        self.cutoff = cutoff
+        self.min_lag = max(2, int(rate / max_freq))
+        self.max_lag = int(np.ceil(rate / min_freq)) + 1
+        self.plans = {}
+        self.batch_plan = None  # Como en YinEstimator: un solo plan por lotes
+
+    def estimate_frames(self, frames):
+        frames = np.atleast_2d(frames)
+        frequencies = np.full(len(frames), np.nan)
+        confidences = np.zeros(len(frames))
+        if frames.shape[-1] <= 2 * self.max_lag:
+            return frequencies, confidences
+
+        plan = self.batch_plan
+        if plan is None or plan.rows != len(frames) or plan.length != frames.shape[-1]:
+            # Soltar el plan anterior antes de reservar el nuevo: no conviven dos lotes en memoria
+            plan = self.batch_plan = None
+            plan = self.batch_plan = McLeodPlan(frames.shape[-1], self.min_lag, self.max_lag, rows=len(frames))
+        nsdf = plan.compute(frames)
+        tau, found = plan.key_maximum(self.cutoff)
+
+        rows = np.flatnonzero(found)
+        tau = tau[rows]
+        left = nsdf[rows, tau - 1]
+        center = nsdf[rows, tau]
+        right = nsdf[rows, tau + 1]
+        denominator = left - 2 * center + right
+        offset = np.zeros(len(rows))
+        np.divide(0.5 * (left - right), denominator, out=offset, where=denominator != 0)
+
+        frequencies[rows] = self.rate / (tau + offset)
+        confidences[rows] = np.clip(center, 0.0, 1.0)
+        return frequencies, confidences
+
+    def estimate(self, data):
+        if len(data) <= 2 * self.max_lag:
+            return None, 0.0
+        plan = self.plans.get(len(data))
+        if plan is None:
+            plan = self.plans[len(data)] = McLeodPlan(len(data), self.min_lag, self.max_lag)
+
+        nsdf = plan.compute(data)
+        tau = plan.key_maximum(self.cutoff)
+        if tau is None:
+            return None, 0.0
+        offset = _parabolic_offset(nsdf[tau - 1], nsdf[tau], nsdf[tau + 1])
+        confidence = min(1.0, max(0.0, float(nsdf[tau])))
+        return float(self.rate / (tau + offset)), confidence
+
+
+ESTIMATORS = {
+    "fft": FFTPeakEstimator,
+    "yin": YinEstimator,
+    "mpm": McLeodEstimator,
+}
+
+
+def create_estimator(name, rate, **kwargs):
+    return ESTIMATORS[name](rate, **kwargs)
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import struct
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from capture import ReplayStream
+from metrics import Metrics
+from noise_gate import NoiseGate
+from tuner_engine import TunerEngine
+
+RATE = 22050
+CHUNK = 4096
+HOP_SIZE = 512
+ANALYSIS_INTERVAL_MS = 20
+WS_PORT = 8765
+UDP_PORT = 8766
+UDP_TIMEOUT_SECONDS = 10.0  # Los clientes UDP deben renovar la suscripción antes de este tiempo
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Buffer de envío del socket: con el del sistema (cientos de KB) un cliente lento recibiría segundos de
+# eventos viejos; así drain() espera pronto y los eventos nuevos reemplazan al pendiente
+WS_WRITE_BUFFER_BYTES = 1024
+
+
+def encode_event(result, sequence, timestamp=None):
+    # Evento compacto: una línea JSON sin espacios
+    event = {
+        "seq": sequence,
+        "t": round(time.time() if timestamp is None else timestamp, 4),
+        "hz": None if result.frequency is None else round(result.frequency, 3),
+        "string": result.string,
+        "cents": None if result.cents is None else round(result.cents, 2),
+        "conf": round(float(result.confidence), 3),
+        "status": result.status,
+    }
+    return json.dumps(event, separators=(",", ":")).encode()
+
+
+def websocket_frame(payload, opcode=0x1):
+    # Trama del servidor al cliente: sin máscara, FIN activado
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_until_close(reader, writer):
+    # Consume las tramas del cliente (con máscara) hasta una trama de cierre o el fin de la conexión;
+    # los ping se contestan con un pong con los mismos datos (RFC 6455, 5.5.2)
+    try:
+        while True:
+            first, second = await reader.readexactly(2)
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack("!H", await reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack("!Q", await reader.readexactly(8))
+            mask = await reader.readexactly(4) if second & 0x80 else None
+            payload = await reader.readexactly(length)
+            opcode = first & 0x0F
+            if opcode == 0x8:
+                return
+            if opcode == 0x9:
+                if mask is not None:
+                    payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+                writer.write(websocket_frame(payload, opcode=0xA))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+
+
+class Subscriber:
+    # Un solo evento pendiente por cliente: si el cliente va lento, el nuevo reemplaza al viejo
+    def __init__(self, name):
+        self.name = name
+        self.pending = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, payload):
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = payload
+        self.ready.set()
+
+    async def next(self):
+        await self.ready.wait()
+        self.ready.clear()
+        payload, self.pending = self.pending, None
+        return payload
+
+
+class UdpBroadcast(asyncio.DatagramProtocol):
+    def __init__(self, timeout=UDP_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.transport = None
+        self.clients = {}  # dirección -> último "subscribe"
+        self.sent = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        command = data.strip().lower()
+        if command == b"subscribe":
+            self.clients[address] = time.monotonic()
+        elif command == b"unsubscribe":
+            self.clients.pop(address, None)
+
+    def broadcast(self, payload):
+        # sendto no bloquea: si el socket está lleno el sistema descarta el datagrama
+        now = time.monotonic()
+        for address, seen in list(self.clients.items()):
+            if now - seen > self.timeout:
+                del self.clients[address]
+                continue
+            self.transport.sendto(payload, address)
+            self.sent += 1
+
+
+class PitchServer:
+    STATS_GAUGES = ("websocket_clients", "websocket_dropped", "udp_clients")  # Instantáneos en stats()
+
+    def __init__(self, stream, engine, hop_size=HOP_SIZE, interval_ms=ANALYSIS_INTERVAL_MS):
+        self.stream = stream
+        self.engine = engine
+        self.interval = interval_ms / 1000.0
+        self.hop_buffer = np.empty(hop_size, dtype=np.int16)
+        self.subscribers = set()
+        self.udp = None
+        self.sequence = 0
+        self.last_event = None
+        self.cleared_windows = 0
+        self.errors = 0
+        engine.subscribe(self.publish)
+
+    def publish(self, result):
+        self.sequence += 1
+        payload = encode_event(result, self.sequence)
+        self.last_event = payload
+        for subscriber in self.subscribers:
+            subscriber.offer(payload)
+        if self.udp is not None:
+            self.udp.broadcast(payload)
+
+    async def run_pipeline(self):
+        # El análisis se hace una sola vez por ventana, para todos los clientes
+        while True:
+            try:
+                self.step()
+            except Exception:
+                # Como en AnalysisScheduler: un frame defectuoso no puede tumbar el servidor
+                self.errors += 1
+                if self.errors == 1:
+                    traceback.print_exc()
+            await asyncio.sleep(self.interval)
+
+    def step(self):
+        windows_ready = 0
+        while self.stream.read_into(self.hop_buffer) is not None:
+            if self.engine.feed(self.hop_buffer):
+                windows_ready += 1
+        # None si una pulsación del mismo bloque vació la ventana después de darla por lista
+        if windows_ready and self.engine.analyze() is None:
+            self.cleared_windows += 1
+
+    async def handle_websocket(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+        # Sin cola en asyncio: drain() espera en cuanto el socket no acepta más datos
+        writer.transport.set_write_buffer_limits(high=0)
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, WS_WRITE_BUFFER_BYTES)
+        subscriber = Subscriber(peer)
+        if self.last_event is not None:
+            subscriber.offer(self.last_event)
+        self.subscribers.add(subscriber)
+        # Solo se lee para detectar el cierre y contestar los ping; los mensajes del cliente se ignoran
+        closed = asyncio.ensure_future(read_until_close(reader, writer))
+        try:
+            while True:
+                next_event = asyncio.ensure_future(subscriber.next())
+                done, _ = await asyncio.wait({next_event, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if closed in done:
+                    next_event.cancel()
+                    writer.write(websocket_frame(b"", opcode=0x8))
+                    break
+                writer.write(websocket_frame(next_event.result()))
+                # Mientras drain espera a un cliente lento, los eventos nuevos sustituyen al pendiente
+                await writer.drain()
+                subscriber.sent += 1
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            closed.cancel()
+            writer.close()
+
+    def stats(self):
+        return {
+            "events": self.sequence,
+            "cleared_windows": self.cleared_windows,
+            "analysis_errors": self.errors,
+            "websocket_clients": len(self.subscribers),
+            "websocket_dropped": sum(subscriber.dropped for subscriber in self.subscribers),
+            "udp_clients": len(self.udp.clients) if self.udp is not None else 0,
+        }
+
+    async def serve(self, host="127.0.0.1", ws_port=WS_PORT, udp_port=UDP_PORT):
+        loop = asyncio.get_running_loop()
+        servers = []
+        if ws_port:
+            servers.append(await asyncio.start_server(self.handle_websocket, host, ws_port))
+        if udp_port:
+            transport, self.udp = await loop.create_datagram_endpoint(UdpBroadcast, local_addr=(host, udp_port))
+            servers.append(transport)
+        try:
+            await self.run_pipeline()
+        finally:
+            for server in servers:
+                server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de eventos de afinación (WebSocket y UDP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ws-port", type=int, default=WS_PORT, help="0 para desactivar")
+    parser.add_argument("--udp-port", type=int, default=UDP_PORT, help="0 para desactivar")
+    parser.add_argument("--estimator", default="yin", choices=["fft", "yin", "mpm"])
+    parser.add_argument("--tuning", default="standard")
+    parser.add_argument("--replay", default=None, help="Captura .gtcap en lugar del micrófono")
+    parser.add_argument("--no-gate", action="store_true", help="Analizar también en silencio")
+    parser.add_argument("--metrics", default=None, help="Al salir, volcar métricas a .json o .prom")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        stream = ReplayStream(args.replay, CHUNK, realtime=True)
+        rate = int(stream.rate)
+    else:
+        # PyAudio solo hace falta con micrófono: --replay funciona sin él
+        from audio_stream import AudioStream
+        stream = AudioStream(8, 1, RATE, CHUNK, use_callback=True)  # 8 = pyaudio.paInt16
+        rate = RATE
+    metrics = Metrics(enabled=args.metrics is not None)
+    engine = TunerEngine(rate, CHUNK, HOP_SIZE, estimator=args.estimator, tuning=args.tuning,
+                         noise_gate=None if args.no_gate else NoiseGate(rate), metrics=metrics)
+    server = PitchServer(stream, engine, HOP_SIZE)
+    metrics.add_source(server.stats, PitchServer.STATS_GAUGES)
+    metrics.add_source(stream.stats, stream.STATS_GAUGES)
+    try:
+        asyncio.run(server.serve(args.host, args.ws_port, args.udp_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.metrics:
+            metrics.dump(args.metrics)
+        stream.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
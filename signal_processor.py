@@ -1,35 +1,478 @@
+from functools import lru_cache
+
 import numpy as np
-from scipy.signal import butter, lfilter
+
+# scipy.signal tarda más en importarse que todo lo demás junto (~1 s en equipos lentos): se importa al
+# diseñar el primer filtro, no al arrancar. Los planes de análisis solo necesitan numpy
+
+# Tipo de los buffers de trabajo del camino en vivo (filtro, ventana, FFT)
+WORK_DTYPE = np.float32
+
+
+@lru_cache(maxsize=None)
+def sosfilt_kernel():
+    # Núcleo de sosfilt que filtra en sitio. Es privado en SciPy y puede cambiar de nombre, de firma o de
+    # comportamiento en cualquier versión: se comprueba una vez contra sosfilt con zi y, si falla o no
+    # coincide, se usa sosfilt público (una copia por bloque)
+    try:
+        from scipy.signal._sosfilt import _sosfilt
+    except (ImportError, AttributeError):
+        return None
+    from scipy.signal import butter, sosfilt
+    sos = butter(2, 0.1, output='sos').astype(WORK_DTYPE)
+    data = np.linspace(-1, 1, 64, dtype=WORK_DTYPE).reshape(1, -1)
+    zi = np.full((1, len(sos), 2), 0.5, dtype=WORK_DTYPE)
+    expected, expected_zi = sosfilt(sos, data, axis=-1, zi=zi.transpose(1, 0, 2))
+    try:
+        _sosfilt(sos, data, zi)
+    except Exception:
+        return None
+    if not (np.allclose(data, expected, rtol=1e-4, atol=1e-5)
+            and np.allclose(zi.transpose(1, 0, 2), expected_zi, rtol=1e-4, atol=1e-5)):
+        return None
+    return _sosfilt
+
+
+@lru_cache(maxsize=None)
+def design_lowpass(rate, cutoff, order=5, output='ba'):
+    from scipy.signal import butter
+    nyquist = 0.5 * rate
+    normal_cutoff = cutoff / nyquist
+    return butter(order, normal_cutoff, btype='low', analog=False, output=output)
+
+
+class StreamingLowpass:
+    def __init__(self, rate, cutoff, order=5, dtype=WORK_DTYPE, channels=None):
+        from scipy.signal import sosfilt_zi
+        self.rate = rate
+        self.cutoff = cutoff
+        self.order = order
+        self.dtype = dtype
+        # channels=None: señal 1-D; con channels, bloques (canales, muestras) filtrados en una sola llamada
+        self.channels = channels
+        self.sos = design_lowpass(rate, cutoff, order, output='sos')
+        self.sos_work = self.sos.astype(dtype)
+        self.kernel = sosfilt_kernel()
+        self.zi_unit = sosfilt_zi(self.sos)
+        # Estado con la forma (lotes, secciones, 2) que usa el núcleo en sitio
+        self.zi = np.zeros((channels or 1,) + self.zi_unit.shape, dtype=dtype)
+        self.primed = False
+        self.workspace = np.zeros((channels or 1, 0), dtype=dtype)
+        self.output = self.workspace if channels else self.workspace[0]
+
+    def reset(self):
+        self.primed = False
+
+    def process(self, data):
+        if not self.primed:
+            # Arrancar en estado estacionario con la primera muestra evita el
+            # transitorio inicial del filtro
+            first = np.reshape(data[..., 0], (-1, 1, 1))
+            np.multiply(self.zi_unit, first, out=self.zi, casting='unsafe')
+            self.primed = True
+
+        if self.workspace.shape[1] != data.shape[-1]:
+            self.workspace = np.empty((len(self.zi), data.shape[-1]), dtype=self.dtype)
+            self.output = self.workspace if self.channels else self.workspace[0]
+        # Las muestras int16 se convierten una sola vez, en el buffer que luego se filtra
+        np.copyto(self.output, data, casting='unsafe')
+        if self.kernel is not None:
+            self.kernel(self.sos_work, self.workspace, self.zi)
+        else:
+            from scipy.signal import sosfilt
+            # sosfilt espera el estado como (secciones, canales, 2)
+            filtered, zi = sosfilt(self.sos_work, self.workspace, axis=-1, zi=self.zi.transpose(1, 0, 2))
+            self.workspace[:] = filtered
+            self.zi[:] = zi.transpose(1, 0, 2)
+        return self.output
+
+
+class StreamingDecimator:
+    def __init__(self, rate, factor=8, cutoff=None, taps_per_phase=16):
+        self.rate = rate
+        self.factor = factor
+        self.output_rate = rate / factor
+        # FIR anti-aliasing por debajo de la nueva Nyquist (tras el paso-bajo de 450 Hz apenas actúa)
+        if cutoff is None:
+            cutoff = 0.8 * self.output_rate / 2
+        self.numtaps = factor * taps_per_phase
+        from scipy.signal import firwin
+        self.taps = firwin(self.numtaps, cutoff, fs=rate)
+        self.reversed_taps = self.taps[::-1].astype(WORK_DTYPE)
+
+        self.history = np.zeros(self.numtaps - 1, dtype=WORK_DTYPE)
+        self.buffer = np.zeros(0, dtype=WORK_DTYPE)
+        self.frames = None
+        self.output = np.zeros(0, dtype=WORK_DTYPE)
+        self.phase = 0  # Muestras de entrada hasta la próxima salida
+        self.primed = False
+
+    def reset(self):
+        self.history.fill(0.0)
+        self.phase = 0
+        self.primed = False
+
+    def process(self, data):
+        if not self.primed:
+            # Historia inicial constante: mismo criterio que el estado inicial del paso-bajo
+            self.history.fill(data[0] if len(data) else 0.0)
+            self.primed = True
+
+        size = len(self.history) + len(data)
+        if len(self.buffer) != size:
+            self.buffer = np.empty(size, dtype=WORK_DTYPE)
+            self.frames = np.lib.stride_tricks.sliding_window_view(self.buffer, self.numtaps)
+        self.buffer[:len(self.history)] = self.history
+        self.buffer[len(self.history):] = data
+
+        # Forma polifásica: solo se calculan las salidas que se conservan (una de cada factor)
+        available = size - self.numtaps + 1
+        count = max(0, -(-(available - self.phase) // self.factor))
+        if len(self.output) != count:
+            self.output = np.empty(count, dtype=WORK_DTYPE)
+        if count:
+            np.matmul(self.frames[self.phase::self.factor], self.reversed_taps, out=self.output)
+
+        self.phase = self.phase + count * self.factor - available
+        self.history[:] = self.buffer[-len(self.history):]
+        return self.output
+
+
+class SlidingWindow:
+    def __init__(self, window_size, hop_size, channels=None):
+        self.window_size = window_size
+        self.hop_size = hop_size
+        # Cada muestra se escribe dos veces (posición y posición + ventana), así
+        # la ventana más reciente siempre es una vista contigua sin copias.
+        # Con channels, una fila por canal y la ventana es (canales, window_size)
+        shape = (2 * window_size,) if channels is None else (channels, 2 * window_size)
+        self.buffer = np.zeros(shape, dtype=WORK_DTYPE)
+        self.position = 0
+        self.filled = 0
+        self.pending = 0
+        # Vistas de solo lectura por posición: quien analiza no puede modificar la ventana
+        self.views = {}
+
+    def reset(self):
+        self.buffer.fill(0.0)
+        self.position = 0
+        self.filled = 0
+        self.pending = 0
+
+    def push(self, samples):
+        incoming = samples.shape[-1]
+        count = incoming
+        if count > self.window_size:
+            samples = samples[..., -self.window_size:]
+            count = self.window_size
+
+        start = self.position
+        end = start + count
+        size = self.window_size
+        buffer = self.buffer
+        if end <= size:
+            buffer[..., start:end] = samples
+            buffer[..., start + size:end + size] = samples
+        else:
+            split = size - start
+            buffer[..., start:size] = samples[..., :split]
+            buffer[..., start + size:] = samples[..., :split]
+            buffer[..., :end - size] = samples[..., split:]
+            buffer[..., size:end] = samples[..., split:]
+
+        self.position = end % size
+        self.filled = min(size, self.filled + count)
+        self.pending += incoming
+
+        if self.filled < size or self.pending < self.hop_size:
+            return False
+        self.pending = 0
+        return True
+
+    def window(self):
+        view = self.views.get(self.position)
+        if view is None:
+            view = self.buffer[..., self.position:self.position + self.window_size]
+            view.flags.writeable = False
+            self.views[self.position] = view
+        return view
+
+
+class AnalysisPlan:
+    # La FFT se queda en float64: la de float32 de numpy reserva un buffer temporal en cada llamada
+    def __init__(self, rate, chunk, min_freq=70.0, max_freq=350.0, fft_size=None, dtype=np.float64):
+        self.rate = rate
+        self.chunk = chunk
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        # fft_size > chunk rellena con ceros para tener bins más finos
+        self.fft_size = fft_size or chunk
+        self.window = np.hamming(chunk).astype(dtype)
+        self.frequencies = np.fft.rfftfreq(self.fft_size, 1.0 / rate)
+        # Banda como índices start/stop: los cortes son vistas, no copias
+        self.band_start = int(np.searchsorted(self.frequencies, min_freq, side='left'))
+        self.band_stop = int(np.searchsorted(self.frequencies, max_freq, side='right'))
+
+        self.windowed = np.zeros(self.fft_size, dtype=dtype)
+        self.spectrum = np.empty(len(self.frequencies), dtype=np.result_type(dtype, np.complex64))
+        self.magnitude = np.zeros(len(self.frequencies), dtype=dtype)
+        self.fft_out_supported = self._supports_fft_out()
+        self.batches = {}  # canales -> buffers 2-D de analyze_batch
+
+    def _supports_fft_out(self):
+        # numpy >= 2.0 acepta out= en rfft; en versiones anteriores se copia
+        try:
+            np.fft.rfft(self.windowed, out=self.spectrum)
+            return True
+        except TypeError:
+            return False
+
+    def analyze(self, data):
+        # Copiar y luego multiplicar en sitio: mezclar tipos en un ufunc usa un buffer temporal
+        windowed = self.windowed[:self.chunk]
+        np.copyto(windowed, data, casting='unsafe')
+        windowed *= self.window
+        if self.fft_out_supported:
+            np.fft.rfft(self.windowed, out=self.spectrum)
+        else:
+            self.spectrum[:] = np.fft.rfft(self.windowed)
+        np.abs(self.spectrum, out=self.magnitude)
+        return self.magnitude
+
+    def analyze_batch(self, frames):
+        # Una FFT 2-D para todas las filas (una por canal); buffers preasignados por número de filas
+        rows = len(frames)
+        buffers = self.batches.get(rows)
+        if buffers is None:
+            buffers = self.batches[rows] = (np.zeros((rows, self.fft_size), dtype=self.windowed.dtype),
+                                            np.empty((rows, len(self.frequencies)), dtype=self.spectrum.dtype),
+                                            np.zeros((rows, len(self.frequencies)), dtype=self.magnitude.dtype))
+        windowed, spectrum, magnitude = buffers
+        np.copyto(windowed[:, :self.chunk], frames, casting='unsafe')
+        windowed[:, :self.chunk] *= self.window
+        if self.fft_out_supported:
+            np.fft.rfft(windowed, axis=-1, out=spectrum)
+        else:
+            spectrum[:] = np.fft.rfft(windowed, axis=-1)
+        np.abs(spectrum, out=magnitude)
+        return magnitude
+
+    def peaks(self, magnitude):
+        # Versión por filas de peak(): frecuencias y magnitudes del pico en la banda de cada canal
+        band = magnitude[:, self.band_start:self.band_stop]
+        indices = self.band_start + np.argmax(band, axis=-1)
+        return self.frequencies[indices], magnitude[np.arange(len(magnitude)), indices]
+
+    def band_frequencies(self):
+        return self.frequencies[self.band_start:self.band_stop]
+
+    def band_magnitude(self):
+        return self.magnitude[self.band_start:self.band_stop]
+
+    def peak(self, magnitude=None):
+        if magnitude is None:
+            magnitude = self.magnitude
+        if self.band_stop <= self.band_start:
+            return None, None
+        index = self.band_start + int(np.argmax(magnitude[self.band_start:self.band_stop]))
+        return self.frequencies[index], magnitude[index]
+
+
+class TargetedPlan:
+    def __init__(self, rate, chunk, center, cents=100.0, step_cents=10.0, harmonics=3, max_freq=None,
+                 min_fundamental=0.1):
+        self.rate = rate
+        self.chunk = chunk
+        self.center = center
+        self.step_cents = step_cents
+        self.min_fundamental = min_fundamental  # Magnitud mínima de la fundamental frente al armónico más fuerte
+        # Rejilla logarítmica: el punto k del armónico h es exactamente h veces el de la fundamental
+        self.offsets = np.arange(-cents, cents + step_cents / 2, step_cents)
+        self.frequencies = center * 2.0 ** (self.offsets / 1200.0)
+        self.harmonics = [h for h in range(1, harmonics + 1)
+                          if h == 1 or max_freq is None or h * center <= max_freq]
+
+        # Banco de DFT (Goertzel en forma matricial) con la ventana ya aplicada: una sola matmul
+        t = np.arange(chunk) / rate
+        window = np.hamming(chunk)
+        phases = 2 * np.pi * np.concatenate([h * self.frequencies for h in self.harmonics])[:, None] * t
+        self.basis = np.concatenate([np.cos(phases) * window, np.sin(phases) * window]).astype(np.float32)
+        self.window = window.astype(np.float32)
+        # Energía de un seno de magnitud |X| en la DFT con ventana: 2·|X|²·Σw² / (Σw)²
+        self.energy_scale = 2.0 * float(np.sum(window ** 2)) / float(np.sum(window)) ** 2
+
+        rows = len(self.harmonics) * len(self.offsets)
+        self.samples = np.empty(chunk, dtype=np.float32)
+        self.windowed = np.empty(chunk, dtype=np.float32)
+        self.energy = 0.0
+        self.projection = np.empty(2 * rows, dtype=np.float32)
+        self.magnitude = np.empty((len(self.harmonics), len(self.offsets)), dtype=np.float32)
+        self.weights = np.array([1.0 / h for h in self.harmonics], dtype=np.float32)
+        self.harmonic_sum = np.empty(len(self.offsets), dtype=np.float32)
+
+    def analyze(self, data):
+        samples = data
+        if data.dtype != np.float32 or not data.flags.c_contiguous:
+            np.copyto(self.samples, data, casting='unsafe')
+            samples = self.samples
+        np.matmul(self.basis, samples, out=self.projection)
+        rows = len(self.projection) // 2
+        np.hypot(self.projection[:rows], self.projection[rows:], out=self.magnitude.reshape(-1))
+        np.matmul(self.weights, self.magnitude, out=self.harmonic_sum)
+        np.multiply(samples, self.window, out=self.windowed)
+        self.energy = float(np.dot(self.windowed, self.windowed))
+        return self.harmonic_sum
+
+    def peak(self):
+        # Devuelve (frecuencia, cents respecto al centro, magnitud, confianza) o None fuera de banda
+        index = int(np.argmax(self.harmonic_sum))
+        if index == 0 or index == len(self.offsets) - 1:
+            return None
+        # Otra nota puede llenar la suma solo con armónicos comunes (4·E2 = 3·A2, 2·E3 = 3·A2):
+        # la fundamental tiene que tener su propio pico, en el mismo punto y con magnitud real
+        fundamental = int(np.argmax(self.magnitude[0]))
+        if fundamental == 0 or fundamental == len(self.offsets) - 1 or abs(fundamental - index) > 1:
+            return None
+        if self.magnitude[0, index] < self.min_fundamental * np.max(self.magnitude[:, index]):
+            return None
+
+        left, center, right = (float(value) for value in self.harmonic_sum[index - 1:index + 2])
+        denominator = left - 2 * center + right
+        shift = 0.5 * (left - right) / denominator if denominator < 0 else 0.0
+        cents = float(self.offsets[index]) + shift * self.step_cents
+        frequency = self.center * 2.0 ** (cents / 1200.0)
+
+        # Magnitud comparable con el pico de la FFT completa; confianza = fracción de la energía de la
+        # ventana que explican la fundamental y sus armónicos
+        magnitude = float(np.max(self.magnitude[:, index]))
+        harmonic_energy = self.energy_scale * float(np.sum(self.magnitude[:, index].astype(np.float64) ** 2))
+        confidence = min(1.0, harmonic_energy / self.energy) if self.energy > 0 else 0.0
+        return frequency, cents, magnitude, confidence
+
+
+class StrobePlan:
+    def __init__(self, rate, chunk, frame_size=None, hop_size=None, harmonics=3):
+        # Dos tramas solapadas de la misma ventana: la B empieza hop_size muestras después que la A
+        self.rate = rate
+        self.hop_size = hop_size or chunk // 4
+        self.frame_size = frame_size or chunk - self.hop_size
+        self.harmonics = harmonics
+        # Hann (no Hamming): lóbulos laterales bajos, la fase del pico no se contamina con la imagen negativa
+        self.window = np.hanning(self.frame_size)
+        # Fase referida al centro de la trama: con la ventana simétrica el término de la ventana es real
+        self.offsets = np.arange(self.frame_size) - (self.frame_size - 1) / 2
+        self.orders = np.arange(1, harmonics + 1)
+        self.phasors = np.empty((harmonics, self.frame_size), dtype=np.complex128)
+        self.frames = np.empty((2, self.frame_size))
+        self.bins = np.empty((2, harmonics), dtype=np.complex128)
+
+    def refine(self, data, coarse_frequency, max_freq=None):
+        # Frecuencia instantánea (vocoder de fase): el avance de fase de cada armónico entre las dos tramas,
+        # medido respecto al que tendría h·coarse_frequency, corrige la estimación dentro de ±rate / (2·hop·h)
+        count = self.harmonics
+        if max_freq is not None:
+            count = max(1, min(count, int(max_freq // coarse_frequency)))
+        end = len(data)
+        start_b = end - self.frame_size
+        start_a = start_b - self.hop_size
+        np.multiply(data[start_a:start_a + self.frame_size], self.window, out=self.frames[0])
+        np.multiply(data[start_b:end], self.window, out=self.frames[1])
+
+        omega = 2 * np.pi * coarse_frequency / self.rate
+        phasors = self.phasors[:count]
+        np.multiply(self.offsets, -1j * omega, out=phasors[0])
+        np.exp(phasors[0], out=phasors[0])
+        for index in range(1, count):
+            np.multiply(phasors[index - 1], phasors[0], out=phasors[index])
+        bins = self.bins[:, :count]
+        np.matmul(self.frames, phasors.T, out=bins)
+
+        first, second = bins
+        magnitude = np.abs(second)
+        if magnitude[0] == 0.0 or abs(first[0]) == 0.0:
+            return None, None
+        orders = self.orders[:count]
+        advance = np.angle(second * np.conj(first)) - orders * omega * self.hop_size
+        deviation = (advance + np.pi) % (2 * np.pi) - np.pi
+        # Cada armónico da una estimación de la fundamental; mediana ponderada por 1/varianza, (h·|X_h|)²:
+        # un zumbido pegado a un solo armónico (120 Hz junto a A2) no arrastra el resultado
+        estimates = coarse_frequency + deviation * self.rate / (2 * np.pi * self.hop_size * orders)
+        weights = (orders * magnitude) ** 2
+        ranked = np.argsort(estimates)
+        cumulative = np.cumsum(weights[ranked])
+        frequency = float(estimates[ranked[np.searchsorted(cumulative, cumulative[-1] / 2)]])
+        # Fase de la fundamental en el centro de la trama B (para el estroboscopio)
+        return frequency, float(np.angle(second[0]))
+
 
 class SignalProcessor:
-    def __init__(self, rate):
+    def __init__(self, rate, window_size=4096, hop_size=512, decimation=1):
         self.rate = rate
+        # Con diezmado, ventana y planes trabajan a rate / decimation (mismo tiempo, menos muestras)
+        self.decimation = decimation
+        self.analysis_rate = rate / decimation
+        self.decimator = StreamingDecimator(rate, decimation) if decimation > 1 else None
+        self.streaming_filters = {}
+        self.sliding_window = SlidingWindow(window_size // decimation, hop_size // decimation)
+        self.analysis_plans = {}
+        self.targeted_plans = {}
+        self.strobe_plans = {}
 
     def fft(self, data):
         return np.fft.rfft(data)
 
+    def analysis_plan(self, chunk, min_freq=70.0, max_freq=350.0, fft_size=None):
+        key = (chunk, min_freq, max_freq, fft_size)
+        if key not in self.analysis_plans:
+            self.analysis_plans[key] = AnalysisPlan(self.analysis_rate, chunk, min_freq, max_freq, fft_size)
+        return self.analysis_plans[key]
+
+    def targeted_plan(self, chunk, center, cents=100.0, step_cents=10.0, harmonics=3, max_freq=None):
+        key = (chunk, center, cents, step_cents, harmonics, max_freq)
+        if key not in self.targeted_plans:
+            self.targeted_plans[key] = TargetedPlan(self.analysis_rate, chunk, center, cents, step_cents, harmonics,
+                                                    max_freq)
+        return self.targeted_plans[key]
+
+    def strobe_plan(self, chunk):
+        if chunk not in self.strobe_plans:
+            self.strobe_plans[chunk] = StrobePlan(self.analysis_rate, chunk)
+        return self.strobe_plans[chunk]
+
     def dominant_freq(self, data, min_freq=70.0, max_freq=350.0):
-        frequencies = np.fft.rfftfreq(len(data), 1.0 / self.rate)
+        plan = self.analysis_plan(len(data), min_freq, max_freq)
         magnitude = np.abs(self.fft(data))
-        relevant_indices = np.where((frequencies >= min_freq) & (frequencies <= max_freq))
-        relevant_frequencies = frequencies[relevant_indices]
-        relevant_magnitudes = magnitude[relevant_indices]
-        if len(relevant_frequencies) > 0:
-            dominant_index = np.argmax(relevant_magnitudes)
-            dominant_freq = relevant_frequencies[dominant_index]
-            dominant_magnitude = relevant_magnitudes[dominant_index]
-            return dominant_freq, dominant_magnitude
-        else:
-            return None, None
+        return plan.peak(magnitude)
 
     def butter_lowpass(self, cutoff, order=5):
-        nyquist = 0.5 * self.rate
-        normal_cutoff = cutoff / nyquist
-        b, a = butter(order, normal_cutoff, btype='low', analog=False)
-        return b, a
+        return design_lowpass(self.rate, cutoff, order)
 
     def lowpass_filter(self, data, cutoff, order=5):
+        from scipy.signal import lfilter
         b, a = self.butter_lowpass(cutoff, order=order)
         y = lfilter(b, a, data)
         return y
 
+    def streaming_lowpass(self, data, cutoff, order=5):
+        key = (cutoff, order)
+        if key not in self.streaming_filters:
+            self.streaming_filters[key] = StreamingLowpass(self.rate, cutoff, order)
+        return self.streaming_filters[key].process(data)
+
+    def reset_filters(self):
+        for streaming_filter in self.streaming_filters.values():
+            streaming_filter.reset()
+
+    def reset(self):
+        self.reset_filters()
+        if self.decimator is not None:
+            self.decimator.reset()
+        self.sliding_window.reset()
+
+    def sliding_analysis(self, data, cutoff, order=5):
+        filtered = self.streaming_lowpass(data, cutoff, order)
+        if self.decimator is not None:
+            filtered = self.decimator.process(filtered)
+        if self.sliding_window.push(filtered):
+            return self.sliding_window.window()
+        return None
@@ -0,0 +1,132 @@
+import tkinter as tk
+from capture import ReplayStream
+from metrics import Metrics
+from multi_input import MultiInputStation, StationInput
+from tuner_engine import STATUS_WAITING, STATUS_IN_TUNE
+
+FORMAT = 8  # pyaudio.paInt16
+CHUNK = 4096
+HOP_SIZE = 512
+DEVICES = [
+    # (índice de dispositivo PyAudio o None para el predeterminado, canales, frecuencia de muestreo)
+    (None, 2, 22050),
+]
+REPLAY_PATHS = []       # Capturas .gtcap en lugar de dispositivos: una entrada por canal
+PITCH_ESTIMATOR = "yin"
+TUNING = "standard"
+DISPLAY_MAX_FPS = 30
+METRICS_ENABLED = False
+READOUT_WIDTH = 260     # Ancho de la barra de cents de cada entrada
+MAX_CENTS_DISPLAY = 50
+
+
+def open_inputs():
+    inputs = []
+    if REPLAY_PATHS:
+        for path in REPLAY_PATHS:
+            stream = ReplayStream(path, CHUNK, realtime=True)
+            for channel in range(stream.channels):
+                inputs.append(StationInput(f"{path} · {channel + 1}", stream, channel))
+        return inputs
+
+    # Solo con dispositivos: las capturas no necesitan PyAudio
+    from audio_stream import AudioStream
+    for device_index, channels, rate in DEVICES:
+        stream = AudioStream(FORMAT, channels, rate, CHUNK, use_callback=True, device_index=device_index)
+        device = "pred." if device_index is None else device_index
+        for channel in range(channels):
+            inputs.append(StationInput(f"Disp. {device} · canal {channel + 1}", stream, channel))
+    return inputs
+
+
+class StationGUI:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Banco de Afinación")
+        self.root.configure(bg="#0a0a0a")
+
+        self.metrics = Metrics(enabled=METRICS_ENABLED)
+        self.station = MultiInputStation(open_inputs(), CHUNK, HOP_SIZE, estimator=PITCH_ESTIMATOR,
+                                         metrics=self.metrics, tuning=TUNING)
+        self.readouts = {}
+        self.label_state = {}
+        self.setup_ui()
+
+        self.station.start()
+        self.refresh_display()
+
+    def setup_ui(self):
+        title_label = tk.Label(self.root, text="BANCO DE AFINACIÓN", font=("Helvetica", 18, "bold"),
+                               bg="#0a0a0a", fg="#00d9ff")
+        title_label.pack(pady=(10, 5))
+
+        for entry in self.station.inputs:
+            row = tk.Frame(self.root, bg="#0a0a0a")
+            row.pack(fill=tk.X, padx=15, pady=4)
+
+            name_label = tk.Label(row, text=entry.name, font=("Helvetica", 9), width=22, anchor="w",
+                                  bg="#0a0a0a", fg="#888888")
+            name_label.pack(side=tk.LEFT)
+            string_label = tk.Label(row, text="---", font=("Helvetica", 16, "bold"), width=4,
+                                    bg="#0a0a0a", fg="#00ffaa")
+            string_label.pack(side=tk.LEFT, padx=5)
+
+            # Barra compacta: zona afinada en verde y una aguja que solo se mueve
+            canvas = tk.Canvas(row, bg="#1a1a1a", width=READOUT_WIDTH, height=26, highlightthickness=0)
+            canvas.pack(side=tk.LEFT, padx=5)
+            center = READOUT_WIDTH / 2
+            zone = READOUT_WIDTH / 2 * 25 / MAX_CENTS_DISPLAY
+            canvas.create_rectangle(center - zone, 0, center + zone, 26, fill="#003300", outline="")
+            canvas.create_line(center, 0, center, 26, fill="#00ff66", width=2)
+            needle = canvas.create_line(center, 2, center, 24, fill="#ffff00", width=3)
+
+            cents_label = tk.Label(row, text="", font=("Helvetica", 10, "bold"), width=10,
+                                   bg="#0a0a0a", fg="#888888")
+            cents_label.pack(side=tk.LEFT, padx=5)
+            self.readouts[entry.name] = (string_label, canvas, needle, cents_label)
+
+    def refresh_display(self):
+        # Solo el último resultado de cada entrada; los intermedios se descartan
+        for entry in self.station.inputs:
+            result = self.station.latest(entry.name)
+            if result is not None:
+                self.show_result(entry.name, result)
+        self.root.after(1000 // DISPLAY_MAX_FPS, self.refresh_display)
+
+    def show_result(self, name, result):
+        string_label, canvas, needle, cents_label = self.readouts[name]
+        center = READOUT_WIDTH / 2
+        if result.status == STATUS_WAITING:
+            self.set_label(string_label, "---")
+            self.set_label(cents_label, "", "#888888")
+            canvas.coords(needle, center, 2, center, 24)
+            return
+
+        normalized = max(-1.0, min(1.0, result.cents / MAX_CENTS_DISPLAY))
+        x = center + normalized * (READOUT_WIDTH / 2 - 3)
+        canvas.coords(needle, x, 2, x, 24)
+        color = "#00ff66" if result.status == STATUS_IN_TUNE else "#ff3333"
+        self.set_label(string_label, result.string)
+        self.set_label(cents_label, f"{result.cents:+.1f}¢", color)
+
+    def set_label(self, label, text, fg=None):
+        # Mismo criterio que GuitarTunerGUI: no reconfigurar un Label que no cambia
+        state = (text, fg)
+        if self.label_state.get(label) == state:
+            return
+        self.label_state[label] = state
+        if fg is None:
+            label.config(text=text)
+        else:
+            label.config(text=text, fg=fg)
+
+    def close(self):
+        self.station.close()
+
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = StationGUI(root)
+    try:
+        root.mainloop()
+    finally:
+        app.close()
@@ -0,0 +1,35 @@
+import math
+from collections import deque
+from statistics import median
+
+
+class StringTracker:
+    def __init__(self, history=5, min_frames=3, tolerance_cents=15.0, min_confidence=0.5):
+        # Mediana de las últimas estimaciones fiables, en cents absolutos (1200·log2 f)
+        self.min_frames = min_frames
+        self.tolerance_cents = tolerance_cents
+        self.min_confidence = min_confidence
+        self.pitches = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        self.pitches.clear()
+        self.stable = None
+
+    def update(self, frequency, confidence):
+        # Devuelve la frecuencia mediana en cuanto la nota es estable; None mientras no lo sea
+        if frequency is None or frequency <= 0 or confidence < self.min_confidence:
+            # Un frame dudoso no cuenta, pero tampoco rompe la racha: la mediana ya ignora valores sueltos
+            return None
+
+        self.pitches.append(1200 * math.log2(frequency))
+        if len(self.pitches) < self.min_frames:
+            return None
+
+        center = median(self.pitches)
+        recent = list(self.pitches)[-self.min_frames:]
+        if max(abs(pitch - center) for pitch in recent) > self.tolerance_cents:
+            self.stable = None
+            return None
+        self.stable = 2 ** (center / 1200)
+        return self.stable
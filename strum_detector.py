@@ -0,0 +1,114 @@
+import numpy as np
+
+from signal_processor import AnalysisPlan
+
+
+class StrumDetector:
+    def __init__(self, rate, chunk, references, harmonics=4, search_cents=100.0, step_cents=1.0,
+                 zero_padding=8, min_salience=6.0, masking_ratio=0.4, refine_cents=30.0,
+                 relative_threshold=0.1):
+        self.rate = rate
+        self.strings = list(references)
+        self.reference = np.array([references[key] for key in self.strings])
+        self.min_salience = min_salience
+        self.masking_ratio = masking_ratio
+        self.relative_threshold = relative_threshold
+        self.step_cents = step_cents
+
+        # Zero-padding: con 4096 muestras un bin son ~113 cents en E2; x8 deja el error en ~1 cent
+        self.plan = AnalysisPlan(rate, chunk, 60.0, 1000.0, fft_size=chunk * zero_padding)
+        bin_width = rate / self.plan.fft_size
+
+        # Candidatos: cada cuerda ± search_cents, con sus armónicos (cuerdas x candidatos x armónicos)
+        self.offsets = np.arange(-search_cents, search_cents + step_cents / 2, step_cents)
+        candidates = self.reference[:, None] * 2.0 ** (self.offsets / 1200.0)
+        self.candidates = candidates
+        harmonic_numbers = np.arange(1, harmonics + 1)
+        positions = candidates[:, :, None] * harmonic_numbers / bin_width
+
+        # Interpolación lineal entre bins precalculada: índices y pesos fijos
+        last_bin = len(self.plan.frequencies) - 2
+        self.lower = np.minimum(np.floor(positions).astype(np.intp), last_bin)
+        self.upper = self.lower + 1
+        # Los buffers siguen el tipo del espectro del plan (float32 en el camino en vivo)
+        dtype = self.plan.magnitude.dtype
+        self.fraction = (positions - self.lower).astype(dtype)
+        # Los armónicos altos pesan menos; los que pasan de Nyquist no cuentan
+        self.weights = np.where(positions < last_bin, 1.0 / harmonic_numbers, 0.0).astype(dtype)
+        self.weight_total = self.weights[:, 0, :].sum(axis=1, dtype=np.float64)
+
+        shape = positions.shape
+        self.lower_values = np.empty(shape, dtype=dtype)
+        self.upper_values = np.empty(shape, dtype=dtype)
+        self.harmonic_sum = np.empty(shape[:2], dtype=dtype)
+
+        self.frequencies = np.zeros(len(self.strings))
+        self.cents = np.zeros(len(self.strings))
+        self.salience = np.zeros(len(self.strings))
+        self.fundamental = np.zeros(len(self.strings))
+        self.rows = np.arange(len(self.strings))
+        self.columns = np.arange(len(self.offsets))
+        self.refine_steps = int(refine_cents / step_cents)
+        self.fundamental_row = np.empty(shape[:2], dtype=dtype)
+        self.harmonic_numbers = harmonic_numbers
+
+    def analyze(self, window):
+        magnitude = self.plan.analyze(window)
+
+        # Suma armónica de todos los candidatos de todas las cuerdas en una sola pasada
+        np.take(magnitude, self.lower, out=self.lower_values)
+        np.take(magnitude, self.upper, out=self.upper_values)
+        self.upper_values -= self.lower_values
+        self.upper_values *= self.fraction
+        self.lower_values += self.upper_values
+        self.lower_values *= self.weights
+        np.sum(self.lower_values, axis=2, out=self.harmonic_sum)
+
+        # La suma armónica elige la zona; los parciales compartidos con otras cuerdas
+        # la sesgan, así que el cent exacto se toma del pico de la fundamental cerca de ella
+        coarse = np.argmax(self.harmonic_sum, axis=1)
+        near = np.abs(self.columns[None, :] - coarse[:, None]) <= self.refine_steps
+        np.copyto(self.fundamental_row, self.lower_values[:, :, 0])
+        self.fundamental_row[~near] = 0.0
+        best = np.argmax(self.fundamental_row, axis=1)
+
+        inner = np.clip(best, 1, len(self.offsets) - 2)
+        left = self.fundamental_row[self.rows, inner - 1]
+        center = self.fundamental_row[self.rows, inner]
+        right = self.fundamental_row[self.rows, inner + 1]
+
+        # Interpolación parabólica sobre la rejilla de cents
+        denominator = left - 2 * center + right
+        shift = np.divide(0.5 * (left - right), denominator, out=np.zeros(len(self.strings)),
+                          where=denominator < 0)
+        shift = np.where(best == inner, np.clip(shift, -0.5, 0.5), 0.0)
+        self.cents[:] = self.offsets[best] + shift * self.step_cents
+        np.multiply(self.reference, 2.0 ** (self.cents / 1200.0), out=self.frequencies)
+
+        # Saliencia: suma armónica y fundamental frente al suelo de ruido de la banda
+        floor = np.median(self.plan.band_magnitude())
+        if floor > 0:
+            np.divide(self.harmonic_sum[self.rows, coarse], floor * self.weight_total, out=self.salience)
+            np.divide(self.fundamental_row[self.rows, best], floor, out=self.fundamental)
+        else:
+            self.salience.fill(0.0)
+            self.fundamental.fill(0.0)
+        # Un máximo en el borde de la búsqueda no es una lectura válida
+        self.salience[(best != inner) | (coarse == 0) | (coarse == len(self.offsets) - 1)] = 0.0
+        return self.frequencies, self.cents, self.salience
+
+    def present(self):
+        # Sin fundamental propia, la suma armónica puede venir de parciales de otras cuerdas
+        # y una fuga muy débil junto a una cuerda fuerte no cuenta como cuerda sonando
+        threshold = max(self.min_salience, self.relative_threshold * np.max(self.fundamental))
+        present = (self.salience >= self.min_salience) & (self.fundamental >= threshold)
+
+        # Parciales coincidentes (3er armónico de E2 ≈ B3, 4º ≈ E4): una cuerda que cae sobre un
+        # armónico de otra más grave y mucho más fuerte se considera explicada por esa otra
+        ratio = self.frequencies[:, None] / self.frequencies[None, :]
+        harmonic = np.rint(ratio)
+        on_harmonic = (harmonic >= 2) & (harmonic <= self.harmonic_numbers[-1]) & (
+            np.abs(1200 * np.log2(ratio / np.maximum(harmonic, 1))) < 50)
+        weaker = self.salience[:, None] < self.masking_ratio * self.salience[None, :]
+        masked = np.any(on_harmonic & weaker & present[None, :], axis=1)
+        return present & ~masked
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def detune(frequency, cents):
+    return frequency * 2 ** (cents / 1200.0)
+
+
+def plucked_string(frequency, duration=1.0, rate=22050, cents=0.0, harmonics=8, decay=1.5,
+                   brightness=0.7, inharmonicity=0.0, noise_level=0.0, hum_level=0.0,
+                   hum_frequency=60.0, amplitude=8000.0, seed=None):
+    rng = np.random.default_rng(seed)
+    fundamental = detune(frequency, cents)
+    t = np.arange(int(duration * rate)) / rate
+    signal = np.zeros(len(t))
+
+    for k in range(1, harmonics + 1):
+        # Cuerda real: parciales ligeramente estirados y que decaen más rápido cuanto más agudos
+        partial = fundamental * k * np.sqrt(1 + inharmonicity * k * k)
+        if partial >= rate / 2:
+            break
+        envelope = np.exp(-decay * k ** 0.5 * t)
+        phase = rng.uniform(0, 2 * np.pi)
+        signal += (brightness ** (k - 1)) * envelope * np.sin(2 * np.pi * partial * t + phase)
+
+    peak = np.max(np.abs(signal))
+    if peak > 0:
+        signal *= amplitude / peak
+
+    if hum_level > 0:
+        # Zumbido de red: fundamental y segundo armónico
+        signal += hum_level * amplitude * (np.sin(2 * np.pi * hum_frequency * t)
+                                           + 0.5 * np.sin(2 * np.pi * 2 * hum_frequency * t))
+    if noise_level > 0:
+        signal += rng.normal(0, noise_level * amplitude, len(t))
+
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def silence(duration=1.0, rate=22050, noise_level=0.0, amplitude=8000.0, seed=None):
+    rng = np.random.default_rng(seed)
+    signal = rng.normal(0, noise_level * amplitude, int(duration * rate)) if noise_level > 0 else np.zeros(int(duration * rate))
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def chunks(signal, size):
+    for start in range(0, len(signal) - size + 1, size):
+        yield signal[start:start + size]
@@ -0,0 +1,359 @@
+import math
+from collections import namedtuple
+
+from metrics import Metrics
+from note_table import A4_FREQUENCY, NoteTable
+from pitch_estimator import create_estimator
+from signal_processor import SignalProcessor
+from string_tracker import StringTracker
+from strum_detector import StrumDetector
+
+# Afinación estándar (E4 ... E2, de la 1ª a la 6ª cuerda); otras afinaciones en note_table.TUNINGS
+REFERENCE_FREQUENCIES = NoteTable.from_tuning("standard").references
+
+STATUS_WAITING = "waiting"
+STATUS_IN_TUNE = "in_tune"
+STATUS_SHARP = "sharp"
+STATUS_FLAT = "flat"
+
+IN_TUNE_CENTS = 25
+
+TunerResult = namedtuple(
+    "TunerResult",
+    ["frequency", "string", "cents", "status", "confidence",
+     "peak_frequency", "magnitude", "auto_detect", "detected", "strings", "strobe_phase"],
+    defaults=(None, None)
+)
+
+# Lectura de una cuerda en modo rasgueo
+StringReading = namedtuple("StringReading", ["string", "frequency", "cents", "status", "salience"])
+
+
+def tuning_status(cents_offset):
+    if abs(cents_offset) <= IN_TUNE_CENTS:
+        return STATUS_IN_TUNE
+    if cents_offset > IN_TUNE_CENTS:
+        return STATUS_SHARP
+    return STATUS_FLAT
+
+
+class TunerEngine:
+    def __init__(self, rate=22050, chunk=4096, hop_size=512, estimator="yin",
+                 pitch_window=2048, min_confidence=0.8, cutoff=450.0, metrics=None,
+                 tuning="standard", a4=A4_FREQUENCY, targeted=True, decimation=1, noise_gate=None):
+        self.rate = rate
+        self.chunk = chunk
+        self.cutoff = cutoff
+        # Tras el paso-bajo la señal se puede diezmar: el análisis usa rate y tamaños divididos
+        self.decimation = decimation
+        self.analysis_rate = rate / decimation
+        self.analysis_chunk = chunk // decimation
+        self.pitch_window = pitch_window // decimation
+        # La magnitud de la DFT crece con el número de muestras: el umbral se escala igual
+        self.magnitude_scale = self.analysis_chunk / chunk
+        self.min_confidence = min_confidence
+        self.metrics = metrics if metrics is not None else Metrics()
+        # Puerta de ruido opcional (NoiseGate): sin señal no se filtra ni se analiza nada
+        self.noise_gate = noise_gate
+
+        self.estimator = estimator
+        # Con una cuerda fijada basta un banco de DFT estrecho alrededor de su nota
+        self.targeted = targeted
+        self.targeted_plan = None
+        self.spectrum = None
+
+        self.signal_processor = SignalProcessor(rate, window_size=chunk, hop_size=hop_size, decimation=decimation)
+
+        self.auto_detect_mode = True
+        # La cuerda se fija en cuanto la nota es estable (StringTracker) y se suelta en la siguiente pulsación
+        self.string_tracker = StringTracker(min_confidence=min_confidence)
+        self.auto_locked = False
+        self.onset_samples = 0  # Muestras desde la última pulsación (o reset) para medir el tiempo hasta fijar
+        self.lock_time = None
+
+        self.strum_mode = False
+        self.strum_detector = None
+        # Modo estroboscopio: la frecuencia se refina con la fase del pico entre dos tramas solapadas
+        self.strobe_mode = False
+        self.strobe_plan = self.signal_processor.strobe_plan(self.analysis_chunk)
+        self.sample_clock = 0  # Muestras recibidas desde reset(): reloj del oscilador de referencia
+        self.set_tuning(tuning, a4)
+
+        self.window = None
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def reset(self):
+        self.signal_processor.reset()
+        if self.noise_gate is not None:
+            self.noise_gate.reset()
+        self.window = None
+        self.string_tracker.reset()
+        self.onset_samples = 0
+        self.sample_clock = 0
+
+    def select_string(self, string_key):
+        self.current_string = string_key
+        self.auto_detect_mode = False
+        self.auto_locked = False
+        if self.targeted:
+            self.targeted_plan = self.signal_processor.targeted_plan(self.analysis_chunk, self.references[string_key],
+                                                                     max_freq=self.cutoff)
+
+    def enable_auto_detect(self):
+        self.auto_detect_mode = True
+        self.auto_locked = False
+        self.string_tracker.reset()
+        self.onset_samples = 0
+
+    def set_tuning(self, tuning="standard", a4=A4_FREQUENCY):
+        self.note_table = NoteTable.from_tuning(tuning, a4)
+        self.tuning = tuning
+        self.references = self.note_table.references
+        self.current_string = self.note_table.keys[0]
+        self.string_tracker.reset()
+        self.targeted_plan = None
+
+        # La banda de búsqueda se abre para cuerdas fuera de 70-350 Hz (7 cuerdas, bajo)
+        self.min_freq = min(70.0, 0.85 * min(self.references.values()))
+        self.max_freq = max(350.0, 1.06 * max(self.references.values()))
+        self.analysis_plan = self.signal_processor.analysis_plan(self.analysis_chunk, self.min_freq, self.max_freq)
+        self.pitch_estimator = create_estimator(self.estimator, self.analysis_rate, min_freq=self.min_freq,
+                                                max_freq=self.max_freq)
+        # El detector de rasgueo depende de las referencias: se reconstruye al usarlo
+        self.strum_detector = None
+        if self.strum_mode:
+            self.enable_strum_mode()
+
+    def enable_strum_mode(self, enabled=True):
+        # El detector polifónico se crea solo si se usa: precalcula la rejilla de candidatos
+        if enabled and self.strum_detector is None:
+            self.strum_detector = StrumDetector(self.analysis_rate, self.analysis_chunk, self.references,
+                                                zero_padding=8 * self.decimation)
+        self.strum_mode = enabled
+
+    def enable_strobe_mode(self, enabled=True):
+        self.strobe_mode = enabled
+
+    def magnitude_threshold(self, reference_freq):
+        if self.noise_gate is not None:
+            # Con la puerta el suelo de ruido adaptativo decide si hay señal, no la ganancia del micro
+            return 0.0
+        return max(50, int(reference_freq * 0.8)) * self.magnitude_scale
+
+    def detect_string(self, frequency):
+        string_key, _ = self.note_table.nearest(frequency)
+        return string_key
+
+    def feed(self, samples):
+        # Filtra y acumula un salto; devuelve True si hay una ventana nueva lista
+        # El reloj cuenta también los saltos en silencio: la ventana siempre termina en sample_clock
+        self.sample_clock += len(samples)
+        if self.noise_gate is not None and not self._gate(samples):
+            return False
+        self.onset_samples += len(samples)
+        with self.metrics.stage("filter"):
+            window = self.signal_processor.sliding_analysis(samples, self.cutoff)
+        if window is not None:
+            self.window = window
+            return True
+        return False
+
+    def _gate(self, samples):
+        gate = self.noise_gate
+        was_open = gate.is_open
+        with self.metrics.stage("gate"):
+            is_open = gate.process(samples)
+
+        if gate.onset:
+            # Pulsación nueva: la ventana se llena desde aquí, sin restos de la nota anterior
+            self.metrics.increment("onsets")
+            self.signal_processor.reset()
+            self.window = None
+            self.string_tracker.reset()
+            self.onset_samples = 0
+            if self.auto_locked:
+                # La cuerda fijada automáticamente se suelta: la nueva nota puede ser otra cuerda
+                self.enable_auto_detect()
+        if is_open:
+            return True
+
+        self.metrics.increment("gated_hops")
+        if was_open:
+            # Al cerrarse la puerta los suscriptores reciben una lectura de espera
+            result = TunerResult(None, self.current_string, None, STATUS_WAITING, 0.0, None, 0.0,
+                                 self.auto_detect_mode, False)
+            for listener in self.listeners:
+                listener(result)
+        return False
+
+    def process(self, samples):
+        if self.feed(samples):
+            return self.analyze()
+        return None
+
+    def _update_detection(self, frequency, confidence):
+        stable_frequency = self.string_tracker.update(frequency, confidence)
+        if stable_frequency is not None:
+            locked_string = self.detect_string(stable_frequency)
+            if locked_string:
+                self.lock_time = self.onset_samples / self.rate
+                self.metrics.observe("time_to_lock", self.lock_time)
+                self.select_string(locked_string)
+                self.auto_locked = True
+                return True
+
+        detected_string = self.detect_string(frequency)
+        if detected_string:
+            self.current_string = detected_string
+            return True
+
+        self.current_string = self.note_table.keys[0]  # Mantener por defecto
+        return False
+
+    def analyze(self, window=None):
+        if window is None:
+            window = self.window
+        if window is None:
+            # Una pulsación nueva vació la ventana después de que un salto anterior del mismo bloque la diera
+            # por lista: no hay nada que analizar hasta que se vuelva a llenar
+            return None
+
+        with self.metrics.stage("analyze"):
+            result = None
+            if self.strum_mode:
+                result = self._analyze_strum(window)
+            elif self.targeted_plan is not None and not self.auto_detect_mode:
+                result = self._analyze_targeted(window)
+            if result is None:
+                result = self._analyze(window)
+            if self.strobe_mode and result.frequency is not None and result.strings is None:
+                result = self._refine_strobe(window, result)
+
+        for listener in self.listeners:
+            listener(result)
+        return result
+
+    def _analyze(self, window):
+        # Una sola FFT por frame: el plan reutiliza ventana, banda y buffers
+        with self.metrics.stage("fft"):
+            self.spectrum = self.analysis_plan.analyze(window)
+            dominant_frequency, dominant_magnitude = self.analysis_plan.peak()
+
+        # El estimador temporal usa una ventana más corta y ya resuelve los errores de octava
+        with self.metrics.stage("estimator"):
+            pitch, confidence = self.pitch_estimator.estimate(window[-self.pitch_window:])
+        estimator_confident = pitch is not None and confidence >= self.min_confidence
+        if estimator_confident:
+            dominant_frequency = pitch
+
+        detected = False
+        filtered_frequency = dominant_frequency
+
+        if not estimator_confident and dominant_frequency is not None and dominant_frequency > 0:
+            # Candidatos armónicos (2, 2.5, 3, 3.5, 4 × cada cuerda) precalculados en la tabla
+            filtered_frequency = self.note_table.harmonic_correction(dominant_frequency)
+
+        # Una sola actualización por frame, con la frecuencia ya corregida
+        if self.auto_detect_mode:
+            detected = self._update_detection(filtered_frequency, confidence)
+
+        reference_freq = self.references[self.current_string]
+
+        adjusted_frequency = dominant_frequency
+
+        if not estimator_confident and dominant_frequency is not None and dominant_frequency > 0:
+            ratio = dominant_frequency / reference_freq
+
+            if 1.8 < ratio < 2.2:
+                adjusted_frequency = dominant_frequency / 2
+            elif 1.4 < ratio < 1.6:
+                adjusted_frequency = dominant_frequency / 1.5
+            elif 2.8 < ratio < 3.2:
+                adjusted_frequency = dominant_frequency / 3
+
+        magnitude_threshold = self.magnitude_threshold(reference_freq)
+
+        if (adjusted_frequency is not None and adjusted_frequency > 0
+                and dominant_magnitude > magnitude_threshold):
+            cents_offset = 1200 * math.log2(adjusted_frequency / reference_freq)
+            status = tuning_status(cents_offset)
+            return TunerResult(adjusted_frequency, self.current_string, cents_offset, status,
+                               confidence, dominant_frequency, dominant_magnitude,
+                               self.auto_detect_mode, detected)
+
+        return TunerResult(None, self.current_string, None, STATUS_WAITING, confidence,
+                           dominant_frequency, dominant_magnitude, self.auto_detect_mode, detected)
+
+    def _refine_strobe(self, window, result):
+        # La estimación gruesa (YIN, banco de DFT o pico FFT) solo tiene que caer a menos de ±rate / (2·hop)
+        with self.metrics.stage("strobe"):
+            frequency, phase = self.strobe_plan.refine(window, result.frequency, self.cutoff)
+        if frequency is None or frequency <= 0:
+            return result
+
+        reference_freq = self.references[result.string]
+        cents_offset = 1200 * math.log2(frequency / reference_freq)
+        # Fase de la cuerda menos la de un oscilador a la frecuencia de referencia, ambas en el centro
+        # de la última trama: quieta si está afinada, gira a (frecuencia - referencia) vueltas por segundo
+        center = self.sample_clock / self.decimation - (self.strobe_plan.frame_size + 1) / 2
+        reference_phase = 2 * math.pi * ((reference_freq * center / self.analysis_rate) % 1.0)
+        strobe_phase = (phase - reference_phase) % (2 * math.pi)
+        return result._replace(frequency=frequency, cents=cents_offset, status=tuning_status(cents_offset),
+                               strobe_phase=strobe_phase)
+
+    def _analyze_strum(self, window):
+        # El espectro normal se sigue calculando para el visualizador
+        with self.metrics.stage("fft"):
+            self.spectrum = self.analysis_plan.analyze(window)
+            peak_frequency, peak_magnitude = self.analysis_plan.peak()
+
+        with self.metrics.stage("strum"):
+            detector = self.strum_detector
+            frequencies, cents, salience = detector.analyze(window)
+            present = detector.present()
+
+        readings = []
+        for index, string_key in enumerate(detector.strings):
+            if present[index]:
+                readings.append(StringReading(string_key, float(frequencies[index]), float(cents[index]),
+                                              tuning_status(cents[index]), float(salience[index])))
+            else:
+                readings.append(StringReading(string_key, None, None, STATUS_WAITING, float(salience[index])))
+        readings = tuple(readings)
+
+        # La aguja sigue a la cuerda más fuerte del rasgueo
+        sounding = [reading for reading in readings if reading.frequency is not None]
+        if not sounding:
+            return TunerResult(None, self.current_string, None, STATUS_WAITING, 0.0, peak_frequency,
+                               peak_magnitude, self.auto_detect_mode, False, readings)
+
+        strongest = max(sounding, key=lambda reading: reading.salience)
+        confidence = min(1.0, strongest.salience / (2 * detector.min_salience))
+        return TunerResult(strongest.frequency, strongest.string, strongest.cents, strongest.status,
+                           confidence, peak_frequency, peak_magnitude, self.auto_detect_mode, False, readings)
+
+    def _analyze_targeted(self, window):
+        with self.metrics.stage("targeted"):
+            self.targeted_plan.analyze(window)
+            peak = self.targeted_plan.peak()
+        if peak is None:
+            # Más de ±100 cents fuera de la nota: el análisis completo da una lectura útil
+            return None
+
+        frequency, cents_offset, magnitude, confidence = peak
+        if confidence < self.min_confidence:
+            # La banda no explica la señal (otra cuerda, ruido): mejor el camino completo
+            return None
+        self.spectrum = None
+        reference_freq = self.references[self.current_string]
+        if magnitude <= self.magnitude_threshold(reference_freq):
+            return TunerResult(None, self.current_string, None, STATUS_WAITING, confidence,
+                               frequency, magnitude, False, False)
+        return TunerResult(frequency, self.current_string, cents_offset, tuning_status(cents_offset),
+                           confidence, frequency, magnitude, False, False)
@@ -1,83 +1,236 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
+from metrics import Metrics
+from signal_processor import AnalysisPlan, WORK_DTYPE
+
+WATERFALL_RANGE_DB = 60.0         # Rango de colores por debajo del pico reciente
+WATERFALL_FLOOR_DB = -120.0       # Valor inicial del historial y mínimo de cada columna
+WATERFALL_PEAK_DECAY_DB = 0.05    # El pico de referencia baja esto por columna (1.5 dB/s a 30 columnas/s)
+WATERFALL_RELEASE_DB = 1.5        # Sin lecturas, la última columna se apaga esto por columna (45 dB/s a 30/s)
 
 class AudioVisualizer:
-    def __init__(self, parent_frame, rate=22050, chunk=4096):
+    def __init__(self, parent_frame, rate=22050, chunk=4096, min_freq=70.0, max_freq=350.0, max_fps=20,
+                 metrics=None, waterfall_columns=0, waterfall_fps=30):
         self.rate = rate
+        self.metrics = metrics if metrics is not None else Metrics()
         self.chunk = chunk
-        self.audio_buffer = np.zeros(chunk)
-        self.freq_buffer = np.zeros(chunk // 2)
-        self.frequencies = np.fft.rfftfreq(chunk, 1.0 / rate)
-
-        self.fig, (self.ax_time, self.ax_freq) = plt.subplots(
-            2, 1,
-            figsize=(10, 6),
-            facecolor='#0a0a0a',
-            edgecolor='#00d9ff'
-        )
-
+        # La GUI copia las últimas muestras directamente aquí (read_latest con out=)
+        self.audio_buffer = np.zeros(chunk, dtype=WORK_DTYPE)
+        # FFT propia solo si el análisis no dejó espectro (modo dirigido o diezmado), con buffers fijos
+        self.plan = AnalysisPlan(rate, chunk, min_freq, max_freq)
+        self.frequencies = self.plan.frequencies
+
+        # Solo se dibuja la banda visible del espectro
+        self.band_start = int(np.searchsorted(self.frequencies, min_freq, side='left'))
+        self.band_stop = int(np.searchsorted(self.frequencies, max_freq, side='right'))
+        self.band_frequencies = self.frequencies[self.band_start:self.band_stop]
+        self.freq_buffer = np.zeros(len(self.band_frequencies))
+        self.peak_frequency = None
+
+        self.time_x = np.zeros(0)
+        self.time_y = np.zeros(0)
+        self.samples_per_column = 1
+        self.columns = 0
+
+        # Cascada (espectrograma): historial de espectros de la banda en dB, de tamaño fijo. Avanza una
+        # columna por refresco de pantalla (waterfall_fps), así el eje x es tiempo
+        self.waterfall_columns = waterfall_columns
+        self.waterfall_fps = waterfall_fps
+        self.waterfall_image = None
+        if waterfall_columns:
+            # Cada columna se escribe dos veces (i e i + columnas), como en SlidingWindow: el corte
+            # [:, i:i + columnas] es siempre el historial en orden, sin np.roll ni copias
+            self.waterfall = np.full((len(self.band_frequencies), 2 * waterfall_columns), WATERFALL_FLOOR_DB,
+                                     dtype=np.float32)
+            # Última columna: la escribe update() con cada lectura; sin lecturas se va apagando
+            self.waterfall_column = np.full(len(self.band_frequencies), WATERFALL_FLOOR_DB, dtype=np.float32)
+            self.waterfall_index = 0  # Próxima columna a escribir = la más antigua
+            self.waterfall_floor_columns = waterfall_columns  # Columnas de suelo seguidas al final del historial
+            self.waterfall_peak = None
+
+            self.fig = plt.figure(figsize=(10, 6), facecolor='#0a0a0a', edgecolor='#00d9ff')
+            grid = self.fig.add_gridspec(2, 2, width_ratios=(2, 1))
+            self.ax_time = self.fig.add_subplot(grid[0, 0])
+            self.ax_freq = self.fig.add_subplot(grid[1, 0])
+            self.ax_waterfall = self.fig.add_subplot(grid[:, 1])
+        else:
+            self.fig, (self.ax_time, self.ax_freq) = plt.subplots(
+                2, 1,
+                figsize=(10, 6),
+                facecolor='#0a0a0a',
+                edgecolor='#00d9ff'
+            )
+
+        # Límites fijos: el fondo estático se cachea y solo se redibujan las líneas
         self.ax_time.set_facecolor('#1a1a1a')
         self.ax_time.set_title('Onda de Audio (Dominio del Tiempo)', color='#00d9ff', fontsize=12, fontweight='bold')
-        self.ax_time.set_ylabel('Amplitud', color='#00ffaa')
-        self.ax_time.set_ylim(-32768, 32767)
+        self.ax_time.set_ylabel('Amplitud (normalizada)', color='#00ffaa')
+        self.ax_time.set_xlim(0, chunk)
+        self.ax_time.set_ylim(-1.1, 1.1)
         self.ax_time.tick_params(colors='#888888')
         self.ax_time.grid(True, alpha=0.2, color='#444444')
-        self.line_time, = self.ax_time.plot([], [], color='#ffff00', linewidth=1)
+        self.line_time, = self.ax_time.plot([], [], color='#ffff00', linewidth=1, animated=True)
 
         self.ax_freq.set_facecolor('#1a1a1a')
         self.ax_freq.set_title('Espectro de Frecuencias (FFT)', color='#00d9ff', fontsize=12, fontweight='bold')
         self.ax_freq.set_xlabel('Frecuencia (Hz)', color='#00ffaa')
         self.ax_freq.set_ylabel('Magnitud', color='#00ffaa')
-        self.ax_freq.set_xlim(70, 350)
+        self.ax_freq.set_xlim(min_freq, max_freq)
+        self.ax_freq.set_ylim(0, 1.2)  # Rango normalizado
         self.ax_freq.tick_params(colors='#888888')
         self.ax_freq.grid(True, alpha=0.2, color='#444444')
-        self.line_freq, = self.ax_freq.plot([], [], color='#00ff66', linewidth=2)
-        self.peak_marker, = self.ax_freq.plot([], [], 'r*', markersize=15, label='Pico (Frecuencia Detectada)')
+        self.line_freq, = self.ax_freq.plot([], [], color='#00ff66', linewidth=2, animated=True)
+        self.peak_marker, = self.ax_freq.plot([], [], 'r*', markersize=15, label='Pico (Frecuencia Detectada)',
+                                              animated=True)
         self.ax_freq.legend(loc='upper right', facecolor='#0a0a0a', edgecolor='#00d9ff', labelcolor='#00ffaa')
 
+        self.animated_artists = [self.line_time, self.line_freq, self.peak_marker]
+
+        if waterfall_columns:
+            # Una sola imagen: cada refresco cambia sus datos, nunca se crean artistas nuevos
+            half_bin = (self.frequencies[1] - self.frequencies[0]) / 2
+            self.ax_waterfall.set_facecolor('#1a1a1a')
+            self.ax_waterfall.set_title('Cascada', color='#00d9ff', fontsize=12, fontweight='bold')
+            self.ax_waterfall.set_xlabel('Tiempo (s)', color='#00ffaa')
+            self.ax_waterfall.set_ylabel('Frecuencia (Hz)', color='#00ffaa')
+            self.ax_waterfall.tick_params(colors='#888888')
+            self.waterfall_image = self.ax_waterfall.imshow(
+                self.waterfall[:, :waterfall_columns], origin='lower', aspect='auto', interpolation='nearest',
+                cmap='inferno', vmin=WATERFALL_FLOOR_DB, vmax=WATERFALL_FLOOR_DB + WATERFALL_RANGE_DB,
+                extent=(-waterfall_columns / waterfall_fps, 0, self.band_frequencies[0] - half_bin,
+                        self.band_frequencies[-1] + half_bin),
+                animated=True)
+            self.animated_artists.append(self.waterfall_image)
+        self.background = None
+        self.dirty = False
+
         self.canvas = FigureCanvasTkAgg(self.fig, master=parent_frame)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.widget = self.canvas.get_tk_widget()
+        self.widget.pack(fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
 
         self.fig.tight_layout()
 
-    def update(self, audio_data, dominant_freq=None):
+        # El refresco tiene su propio ritmo, independiente del análisis
+        self.frame_interval_ms = max(1, int(1000 / max_fps))
+        self.widget.after(self.frame_interval_ms, self.render_tick)
+
+    def on_draw(self, event):
+        # Redibujado completo (inicio o cambio de tamaño): cachear el fondo
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.layout_decimation()
+        self.prepare_artists()
+        for artist in self.animated_artists:
+            self.fig.draw_artist(artist)
+
+    def layout_decimation(self):
+        width = max(1, int(self.ax_time.bbox.width))
+        self.samples_per_column = max(1, self.chunk // width)
+        self.columns = self.chunk // self.samples_per_column
+        self.time_x = np.repeat(np.arange(self.columns) * self.samples_per_column, 2).astype(float)
+        self.time_y = np.zeros(2 * self.columns)
+        self.column_min = np.zeros(self.columns)
+        self.column_max = np.zeros(self.columns)
+
+    def update(self, audio_data, dominant_freq=None, spectrum_magnitude=None):
+        if audio_data is None:
+            return
+
         if isinstance(audio_data, bytes):
             audio_array = np.frombuffer(audio_data, dtype=np.int16)
         else:
-            audio_array = np.array(audio_data, dtype=np.int16)
-
-        if len(audio_array) == self.chunk:
-            self.audio_buffer = audio_array.copy()
+            audio_array = np.asarray(audio_data)
 
-        fft_result = np.fft.rfft(self.audio_buffer)
-        magnitude = np.abs(fft_result)
+        if audio_array is not self.audio_buffer and len(audio_array) == self.chunk:
+            np.copyto(self.audio_buffer, audio_array, casting='unsafe')
 
-        if len(magnitude) > 0:
-            magnitude = magnitude / np.max(magnitude) if np.max(magnitude) > 0 else magnitude
+        # Reutilizar el espectro que ya calculó el análisis en lugar de otra FFT
+        if spectrum_magnitude is not None and len(spectrum_magnitude) == len(self.frequencies):
+            np.copyto(self.freq_buffer, spectrum_magnitude[self.band_start:self.band_stop])
+        else:
+            magnitude = self.plan.analyze(self.audio_buffer)
+            np.copyto(self.freq_buffer, magnitude[self.band_start:self.band_stop])
+        if self.waterfall_columns:
+            self.band_to_db(self.freq_buffer)
+
+        self.peak_frequency = dominant_freq
+        self.dirty = True
+
+    def band_to_db(self, band):
+        # Magnitud de la banda (antes de normalizar) en dB, en la columna preasignada
+        column = self.waterfall_column
+        np.maximum(band, 10 ** (WATERFALL_FLOOR_DB / 20), out=column, casting='same_kind')
+        np.log10(column, out=column)
+        column *= 20
+
+    def advance_waterfall(self, waiting=False):
+        # Una columna por refresco de pantalla, haya lectura nueva o no: con nota se repite la última lectura.
+        # Esperando (puerta cerrada) no hay espectro nuevo ni se calcula otra FFT: la última columna se apaga
+        # hasta el suelo. Con todo el historial en el suelo la imagen ya no cambia y no se redibuja
+        if not self.waterfall_columns:
+            return
+        column = self.waterfall_column
+        if waiting:
+            if self.waterfall_floor_columns >= self.waterfall_columns:
+                return
+            column -= WATERFALL_RELEASE_DB
+            np.maximum(column, WATERFALL_FLOOR_DB, out=column)
+            if column.max() <= WATERFALL_FLOOR_DB:
+                self.waterfall_floor_columns += 1
+        else:
+            self.waterfall_floor_columns = 0
 
-        time_axis = np.arange(len(self.audio_buffer))
-        self.line_time.set_data(time_axis, self.audio_buffer)
-        self.ax_time.set_xlim(0, len(self.audio_buffer))
+        index = self.waterfall_index
+        self.waterfall[:, index] = column
+        self.waterfall[:, index + self.waterfall_columns] = column
+        self.waterfall_index = (index + 1) % self.waterfall_columns
 
-        # Ajustar límites Y de la onda de forma dinámica
-        if len(self.audio_buffer) > 0:
-            max_amplitude = np.max(np.abs(self.audio_buffer))
+        peak = float(np.max(column))
+        if self.waterfall_peak is None or peak > self.waterfall_peak - WATERFALL_PEAK_DECAY_DB:
+            self.waterfall_peak = peak
+        else:
+            self.waterfall_peak -= WATERFALL_PEAK_DECAY_DB
+        self.dirty = True
+
+    def prepare_artists(self):
+        if self.columns > 0:
+            # Decimación min/max: un par de puntos por columna de píxeles
+            blocks = self.audio_buffer[:self.columns * self.samples_per_column].reshape(
+                self.columns, self.samples_per_column)
+            np.min(blocks, axis=1, out=self.column_min)
+            np.max(blocks, axis=1, out=self.column_max)
+            self.time_y[0::2] = self.column_min
+            self.time_y[1::2] = self.column_max
+            max_amplitude = max(abs(self.column_min.min()), abs(self.column_max.max()))
             if max_amplitude > 0:
-                self.ax_time.set_ylim(-max_amplitude * 1.1, max_amplitude * 1.1)
-            else:
-                self.ax_time.set_ylim(-32768, 32767)
+                self.time_y /= max_amplitude
+            self.line_time.set_data(self.time_x, self.time_y)
 
-        self.line_freq.set_data(self.frequencies, magnitude)
-        self.ax_freq.set_ylim(0, 1.2)  # Rango normalizado
-
-        if dominant_freq is not None and dominant_freq > 0:
-            closest_idx = np.argmin(np.abs(self.frequencies - dominant_freq))
-            if 0 <= closest_idx < len(magnitude):
-                peak_magnitude = magnitude[closest_idx]
-                self.peak_marker.set_data([dominant_freq], [peak_magnitude])
-
-        self.canvas.draw_idle()
+        max_magnitude = np.max(self.freq_buffer) if len(self.freq_buffer) > 0 else 0
+        if max_magnitude > 0:
+            self.freq_buffer /= max_magnitude
+        self.line_freq.set_data(self.band_frequencies, self.freq_buffer)
 
+        if self.peak_frequency is not None and self.peak_frequency > 0 and len(self.band_frequencies) > 0:
+            closest_idx = np.argmin(np.abs(self.band_frequencies - self.peak_frequency))
+            self.peak_marker.set_data([self.peak_frequency], [self.freq_buffer[closest_idx]])
+        else:
+            self.peak_marker.set_data([], [])
+
+        if self.waterfall_image is not None and self.waterfall_peak is not None:
+            start = self.waterfall_index
+            self.waterfall_image.set_data(self.waterfall[:, start:start + self.waterfall_columns])
+            self.waterfall_image.set_clim(self.waterfall_peak - WATERFALL_RANGE_DB, self.waterfall_peak)
+
+    def render_tick(self):
+        if self.dirty and self.background is not None:
+            with self.metrics.stage("plot_render"):
+                self.prepare_artists()
+                self.canvas.restore_region(self.background)
+                for artist in self.animated_artists:
+                    self.fig.draw_artist(artist)
+                self.canvas.blit(self.fig.bbox)
+            self.dirty = False
+        self.widget.after(self.frame_interval_ms, self.render_tick)